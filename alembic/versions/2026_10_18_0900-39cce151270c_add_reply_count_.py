@@ -0,0 +1,44 @@
+"""add reply_count to CommentModel
+
+Revision ID: 39cce151270c
+Revises: 6fec2f86d644
+Create Date: 2026-10-18 09:00:12.418207
+
+"""
+
+from collections.abc import Sequence
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "39cce151270c"
+down_revision: str | None = "6fec2f86d644"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "comments",
+        sa.Column("reply_count", sa.Integer(), server_default="0", nullable=False),
+    )
+    # backfill: reply_count is the number of direct replies of each comment
+    op.execute(
+        """
+        UPDATE comments AS c
+        SET reply_count = r.reply_count
+        FROM (
+            SELECT parent_id, count(*) AS reply_count
+            FROM comments
+            WHERE parent_id IS NOT NULL
+            GROUP BY parent_id
+        ) AS r
+        WHERE c.id = r.parent_id
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("comments", "reply_count")
@@ -0,0 +1,56 @@
+"""add indexes for the comments queries
+
+Revision ID: 761748c1c565
+Revises: 39cce151270c
+Create Date: 2026-10-18 09:30:41.207114
+
+"""
+
+from collections.abc import Sequence
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "761748c1c565"
+down_revision: str | None = "39cce151270c"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_comments_path",
+            "comments",
+            ["path"],
+            postgresql_using="gist",
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            "ix_comments_post_parent_commented",
+            "comments",
+            ["post_id", "parent_id", "commented", "id"],
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            "ix_comments_post_parent_reply_count",
+            "comments",
+            ["post_id", "parent_id", "reply_count", "id"],
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            "ix_comments_post_parent_reply_count",
+            "comments",
+            postgresql_concurrently=True,
+        )
+        op.drop_index(
+            "ix_comments_post_parent_commented",
+            "comments",
+            postgresql_concurrently=True,
+        )
+        op.drop_index("ix_comments_path", "comments", postgresql_concurrently=True)
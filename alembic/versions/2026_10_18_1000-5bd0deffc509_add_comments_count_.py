@@ -0,0 +1,44 @@
+"""add comments_count to PostModel
+
+Revision ID: 5bd0deffc509
+Revises: 761748c1c565
+Create Date: 2026-10-18 10:00:37.902611
+
+"""
+
+from collections.abc import Sequence
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "5bd0deffc509"
+down_revision: str | None = "761748c1c565"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "posts",
+        sa.Column("comments_count", sa.Integer(), server_default="0", nullable=False),
+    )
+    # backfill: comments_count is the number of top-level comments of each post
+    op.execute(
+        """
+        UPDATE posts AS p
+        SET comments_count = c.comments_count
+        FROM (
+            SELECT post_id, count(*) AS comments_count
+            FROM comments
+            WHERE parent_id IS NULL
+            GROUP BY post_id
+        ) AS c
+        WHERE p.id = c.post_id
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("posts", "comments_count")
@@ -0,0 +1,84 @@
+"""add the read model columns to PostModel
+
+Revision ID: a3f1c9d2b7e4
+Revises: 5bd0deffc509
+Create Date: 2026-10-18 10:30:05.541930
+
+"""
+
+from collections.abc import Sequence
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = "a3f1c9d2b7e4"
+down_revision: str | None = "5bd0deffc509"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    op.add_column("posts", sa.Column("title", sa.String(), nullable=True))
+    op.add_column("posts", sa.Column("body", sa.String(), nullable=True))
+    op.add_column("posts", sa.Column("excerpt", sa.String(), nullable=True))
+    op.add_column("posts", sa.Column("updated", sa.DateTime(timezone=True)))
+    op.add_column(
+        "posts",
+        sa.Column(
+            "tag_list",
+            postgresql.ARRAY(sa.String()),
+            server_default="{}",
+            nullable=False,
+        ),
+    )
+    # backfill from the drafts and the tags, same excerpt as make_excerpt
+    op.execute(
+        """
+        UPDATE posts AS p
+        SET title = d.title,
+            body = d.body,
+            updated = d.updated,
+            excerpt = CASE
+                WHEN length(d.flat) <= 200 THEN d.flat
+                ELSE coalesce(
+                    nullif(substring(left(d.flat, 200) from '^(.*) '), ''),
+                    left(d.flat, 200)
+                ) || '…'
+            END
+        FROM (
+            SELECT id, title, body, updated,
+                   btrim(regexp_replace(body, '\\s+', ' ', 'g')) AS flat
+            FROM drafts
+        ) AS d
+        WHERE p.draft_id = d.id
+        """
+    )
+    op.execute(
+        """
+        UPDATE posts AS p
+        SET tag_list = t.tag_list
+        FROM (
+            SELECT a.post_id, array_agg(tags.tag ORDER BY tags.tag) AS tag_list
+            FROM association_table AS a
+            JOIN tags ON tags.id = a.tag_id
+            GROUP BY a.post_id
+        ) AS t
+        WHERE p.id = t.post_id
+        """
+    )
+    op.alter_column("posts", "title", nullable=False)
+    op.alter_column("posts", "body", nullable=False)
+    op.alter_column("posts", "excerpt", nullable=False)
+    op.create_index("ix_posts_username_slug", "posts", ["username", "slug"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_posts_username_slug", "posts")
+    op.drop_column("posts", "tag_list")
+    op.drop_column("posts", "updated")
+    op.drop_column("posts", "excerpt")
+    op.drop_column("posts", "body")
+    op.drop_column("posts", "title")
@@ -0,0 +1,54 @@
+"""add posts_count to UserModel and the listing index of posts
+
+Revision ID: c7e2a85f4d19
+Revises: a3f1c9d2b7e4
+Create Date: 2026-10-18 11:00:52.118364
+
+"""
+
+from collections.abc import Sequence
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "c7e2a85f4d19"
+down_revision: str | None = "a3f1c9d2b7e4"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "users",
+        sa.Column("posts_count", sa.Integer(), server_default="0", nullable=False),
+    )
+    # backfill: posts_count is the number of published posts of each user
+    op.execute(
+        """
+        UPDATE users AS u
+        SET posts_count = p.posts_count
+        FROM (
+            SELECT username, count(*) AS posts_count
+            FROM posts
+            GROUP BY username
+        ) AS p
+        WHERE u.username = p.username
+        """
+    )
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_posts_username_published",
+            "posts",
+            ["username", "published", "id"],
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            "ix_posts_username_published", "posts", postgresql_concurrently=True
+        )
+    op.drop_column("users", "posts_count")
@@ -0,0 +1,33 @@
+"""add the feed index of posts
+
+Revision ID: e91b04d6a3c2
+Revises: c7e2a85f4d19
+Create Date: 2026-10-18 11:30:19.604872
+
+"""
+
+from collections.abc import Sequence
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "e91b04d6a3c2"
+down_revision: str | None = "c7e2a85f4d19"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_posts_published",
+            "posts",
+            ["published", "id"],
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index("ix_posts_published", "posts", postgresql_concurrently=True)
@@ -0,0 +1,56 @@
+"""add posts_count to TagModel and the tag -> posts index
+
+Revision ID: 4b8d6e0f2a51
+Revises: e91b04d6a3c2
+Create Date: 2026-10-18 12:00:44.730215
+
+"""
+
+from collections.abc import Sequence
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "4b8d6e0f2a51"
+down_revision: str | None = "e91b04d6a3c2"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "tags",
+        sa.Column("posts_count", sa.Integer(), server_default="0", nullable=False),
+    )
+    # backfill: posts_count is the number of published posts of each tag
+    op.execute(
+        """
+        UPDATE tags AS t
+        SET posts_count = a.posts_count
+        FROM (
+            SELECT tag_id, count(*) AS posts_count
+            FROM association_table
+            GROUP BY tag_id
+        ) AS a
+        WHERE t.id = a.tag_id
+        """
+    )
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_association_table_tag_post",
+            "association_table",
+            ["tag_id", "post_id"],
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            "ix_association_table_tag_post",
+            "association_table",
+            postgresql_concurrently=True,
+        )
+    op.drop_column("tags", "posts_count")
@@ -0,0 +1,35 @@
+"""add views and readers to PostModel
+
+Revision ID: f25d9b6c0e87
+Revises: 8a5c3f71e6b0
+Create Date: 2026-10-18 13:00:26.381907
+
+"""
+
+from collections.abc import Sequence
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "f25d9b6c0e87"
+down_revision: str | None = "8a5c3f71e6b0"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "posts",
+        sa.Column("views", sa.BigInteger(), server_default="0", nullable=False),
+    )
+    op.add_column(
+        "posts",
+        sa.Column("readers", sa.BigInteger(), server_default="0", nullable=False),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("posts", "readers")
+    op.drop_column("posts", "views")
@@ -0,0 +1,31 @@
+"""add body_html to PostModel
+
+The existing posts are rendered by ``python -m src.repair`` afterwards, with
+the renderer of the code being deployed rather than whichever one is
+importable when the migration runs.
+
+Revision ID: 1d7e4a09c3b6
+Revises: f25d9b6c0e87
+Create Date: 2026-10-18 13:30:51.042687
+
+"""
+
+from collections.abc import Sequence
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "1d7e4a09c3b6"
+down_revision: str | None = "f25d9b6c0e87"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    op.add_column("posts", sa.Column("body_html", sa.String(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("posts", "body_html")
@@ -0,0 +1,30 @@
+"""add revision to DraftModel
+
+Revision ID: 7c3e9f152d84
+Revises: 1d7e4a09c3b6
+Create Date: 2026-10-18 14:00:33.507318
+
+"""
+
+from collections.abc import Sequence
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "7c3e9f152d84"
+down_revision: str | None = "1d7e4a09c3b6"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "drafts",
+        sa.Column("revision", sa.Integer(), server_default="1", nullable=False),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("drafts", "revision")
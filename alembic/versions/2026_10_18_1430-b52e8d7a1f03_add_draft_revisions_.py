@@ -0,0 +1,55 @@
+"""add DraftRevisionModel
+
+Revision ID: b52e8d7a1f03
+Revises: 7c3e9f152d84
+Create Date: 2026-10-18 14:30:12.774105
+
+"""
+
+from collections.abc import Sequence
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = "b52e8d7a1f03"
+down_revision: str | None = "7c3e9f152d84"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "draft_revisions",
+        sa.Column(
+            "id",
+            sa.BigInteger().with_variant(sa.Integer(), "sqlite"),
+            autoincrement=True,
+            nullable=False,
+        ),
+        sa.Column("revision", sa.Integer(), nullable=False),
+        sa.Column("title", sa.String(), nullable=False),
+        sa.Column("body", sa.String(), nullable=True),
+        sa.Column("delta", postgresql.JSONB(astext_type=sa.Text()), nullable=True),
+        sa.Column("created", sa.DateTime(timezone=True), nullable=False),
+        sa.Column(
+            "draft_id",
+            sa.BigInteger().with_variant(sa.Integer(), "sqlite"),
+            nullable=False,
+        ),
+        sa.ForeignKeyConstraint(["draft_id"], ["drafts.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        "ix_draft_revisions_draft_revision",
+        "draft_revisions",
+        ["draft_id", "revision"],
+        unique=True,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_draft_revisions_draft_revision", "draft_revisions")
+    op.drop_table("draft_revisions")
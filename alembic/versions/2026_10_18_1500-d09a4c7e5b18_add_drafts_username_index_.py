@@ -0,0 +1,39 @@
+"""add the partial index of the unpublished drafts of a user
+
+Revision ID: d09a4c7e5b18
+Revises: b52e8d7a1f03
+Create Date: 2026-10-18 15:00:41.218306
+
+"""
+
+from collections.abc import Sequence
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "d09a4c7e5b18"
+down_revision: str | None = "b52e8d7a1f03"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_drafts_username_created_unpublished",
+            "drafts",
+            ["username", "created", "id"],
+            postgresql_where=sa.text("is_published = false"),
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            "ix_drafts_username_created_unpublished",
+            "drafts",
+            postgresql_concurrently=True,
+        )
@@ -0,0 +1,42 @@
+"""add the unique index of drafts.draft_hash
+
+Revision ID: 6e1f2b9d8c47
+Revises: d09a4c7e5b18
+Create Date: 2026-10-18 15:30:08.940162
+
+"""
+
+from collections.abc import Sequence
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "6e1f2b9d8c47"
+down_revision: str | None = "d09a4c7e5b18"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    # the old timestamp based hashes could collide, give the later drafts new ones
+    op.execute(
+        """
+        UPDATE drafts
+        SET draft_hash = left(md5(random()::text || id::text), 16)
+        WHERE id NOT IN (SELECT min(id) FROM drafts GROUP BY draft_hash)
+        """
+    )
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_drafts_draft_hash",
+            "drafts",
+            ["draft_hash"],
+            unique=True,
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index("ix_drafts_draft_hash", "drafts", postgresql_concurrently=True)
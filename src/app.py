@@ -1,19 +1,23 @@
-from contextlib import asynccontextmanager
+import asyncio
+from contextlib import asynccontextmanager, suppress
 
 from fastapi import FastAPI
 from fastapi.openapi.utils import get_openapi
 from starlette.responses import JSONResponse
 
 from src.core.config import settings
-from src.core.database import AEngine
+from src.core.database import AEngine, ASession
+from src.core.events import get_comment_event_broker
 from src.core.exceptions import Error, DatabaseConnectionError
 from src.core.redis_db import get_redis_client
 from src.core.utils import HTTP, APIKey
+from src.service.view_service import run_views_flusher
 from src.web.auth import router as auth_router
 from src.web.comments import router as comment_router
 from src.web.drafts import router as draft_router
 from src.web.globals import router as global_router
 from src.web.posts import router as post_router
+from src.web.tags import router as tag_router
 from src.web.users import router as user_router
 
 
@@ -25,7 +29,15 @@ async def check_databases(app_: FastAPI):
     except ConnectionRefusedError:
         raise DatabaseConnectionError("PostgreSQL is not available")
     rd = await get_redis_client()
+    comment_events = await get_comment_event_broker(rd)
+    views_flusher = asyncio.create_task(
+        run_views_flusher(ASession, rd, settings.SRB_VIEWS_FLUSH_SECONDS)
+    )
     yield
+    views_flusher.cancel()
+    with suppress(asyncio.CancelledError):
+        await views_flusher
+    await comment_events.close()
     await AEngine.dispose()
     await rd.close()
 
@@ -38,6 +50,7 @@ app.include_router(draft_router, tags=["drafts"], prefix=settings.PREFIX)
 app.include_router(post_router, tags=["posts"], prefix=settings.PREFIX)
 app.include_router(global_router, tags=["global"])
 app.include_router(comment_router, tags=["comments"], prefix=settings.PREFIX)
+app.include_router(tag_router, tags=["tags"], prefix=settings.PREFIX)
 
 
 @app.exception_handler(Error)
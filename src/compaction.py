@@ -0,0 +1,31 @@
+"""Drop the draft revision deltas older than SRB_DRAFT_REVISIONS_RETENTION_DAYS.
+
+Run it with ``python -m src.compaction`` (or ``just compact-revisions``) from
+cron; the snapshots are kept, so old revisions stay readable at the snapshot
+granularity while the per-save deltas do not pile up forever.
+"""
+
+import asyncio
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+from src.core.config import settings
+from src.core.database import AEngine, ASession
+from src.repository.draft_revision_repo import DraftRevisionRepo
+from src.repository.unitofwork import UnitOfWork
+
+
+async def compact_revisions():
+    retention = timedelta(days=settings.SRB_DRAFT_REVISIONS_RETENTION_DAYS)
+    older_than = datetime.now(tz=ZoneInfo("UTC")) - retention
+    async with UnitOfWork(ASession) as session:
+        deltas = await DraftRevisionRepo(session).compact(older_than)
+    print(f"draft revision deltas dropped: {deltas}")
+    print(
+        f"revisions saved before {older_than.isoformat()} are now only readable as snapshots"
+    )
+    await AEngine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(compact_revisions())
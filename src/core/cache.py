@@ -0,0 +1,123 @@
+import hashlib
+from typing import get_args
+
+from src.core.redis_db import RedisClient
+from src.core.schemas import BodyFormat
+
+
+def _post_page_base(username: str, link: str) -> str:
+    return f"posts:@{username}/{link}"
+
+
+def post_page_key(username: str, link: str, body_format: BodyFormat = "markdown") -> str:
+    return f"{_post_page_base(username, link)}:{body_format}"
+
+
+def _post_page_index_key(post_id: int) -> str:
+    return f"posts:{post_id}:page"
+
+
+def open_read_draft_key(username: str, slug: str) -> str:
+    return f"drafts:@{username}/{slug}"
+
+
+def _open_read_draft_index_key(draft_id: int) -> str:
+    return f"drafts:{draft_id}:open-read"
+
+
+_FEED_GENERATION_KEY = "posts:feed:generation"
+
+
+async def feed_head_key(redis_client: RedisClient, how_many: int) -> str:
+    generation = await redis_client.get(_FEED_GENERATION_KEY, 0)
+    return f"posts:feed:{generation}:{how_many}"
+
+
+async def invalidate_feed(redis_client: RedisClient | None):
+    """Move the feed to a new generation, the old head pages just expire"""
+    if redis_client is not None:
+        await redis_client.incr(_FEED_GENERATION_KEY)
+
+
+def make_etag(body: bytes) -> str:
+    return f'"{hashlib.sha256(body).hexdigest()}"'
+
+
+def etag_matches(etag: str, if_none_match: str | None) -> bool:
+    """Weak comparison of `etag` against an If-None-Match header"""
+    if if_none_match is None:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = (tag.strip().removeprefix("W/") for tag in if_none_match.split(","))
+    return etag in candidates
+
+
+def draft_etag(draft_id: int, revision: int) -> str:
+    return f'"draft-{draft_id}-{revision}"'
+
+
+def if_match_revisions(draft_id: int, if_match: str | None) -> list[int] | None:
+    """The revisions of the draft an If-Match header accepts, None for any.
+
+    If-Match uses the strong comparison, so weak tags never match.
+    """
+    if if_match is None or if_match.strip() == "*":
+        return None
+    prefix = f'"draft-{draft_id}-'
+    revisions = []
+    for tag in map(str.strip, if_match.split(",")):
+        revision = tag.removeprefix(prefix).removesuffix('"')
+        if tag.startswith(prefix) and tag.endswith('"') and revision.isdigit():
+            revisions.append(int(revision))
+    return revisions
+
+
+async def cache_post_page(
+    redis_client: RedisClient,
+    username: str,
+    link: str,
+    body_format: BodyFormat,
+    page: tuple[int, bytes, str],
+    timeout: int,
+):
+    post_id = page[0]
+    key = post_page_key(username, link, body_format)
+    await redis_client.set(key, page, timeout=timeout)
+    # the post is only known by its id on the write paths
+    await redis_client.set(
+        _post_page_index_key(post_id), _post_page_base(username, link), timeout=timeout
+    )
+
+
+async def invalidate_post_page(redis_client: RedisClient | None, post_id: int):
+    if redis_client is None:
+        return
+    index_key = _post_page_index_key(post_id)
+    base = await redis_client.get(index_key)
+    if base is not None:
+        keys = [f"{base}:{body_format}" for body_format in get_args(BodyFormat)]
+        await redis_client.delete(*keys, index_key)
+
+
+async def cache_open_read_draft(
+    redis_client: RedisClient,
+    username: str,
+    slug: str,
+    page: tuple[int, bytes],
+    timeout: int,
+):
+    draft_id = page[0]
+    key = open_read_draft_key(username, slug)
+    await redis_client.set(key, page, timeout=timeout)
+    # the draft is only known by its id on the write paths
+    await redis_client.set(_open_read_draft_index_key(draft_id), key, timeout=timeout)
+
+
+async def invalidate_open_read_draft(redis_client: RedisClient | None, draft_id: int):
+    if redis_client is None:
+        return
+    index_key = _open_read_draft_index_key(draft_id)
+    key = await redis_client.get(index_key)
+    if key is not None:
+        await redis_client.delete(key, index_key)
@@ -12,6 +12,18 @@ class Settings(BaseSettings):
     SRB_ACCESS_TOKEN_EXPIRE_MINUTES: int = 2 * 60  # two hours
     SRB_REFRESH_TOKEN_EXPIRE_MINUTES: int = 2 * 24 * 60  # two days
     SRB_TFA_EXPIRE_MINUTES: int = 15
+    SRB_COMMENTS_CACHE_EXPIRE_SECONDS: int = 60
+    SRB_POST_CACHE_EXPIRE_SECONDS: int = 5 * 60
+    SRB_FEED_CACHE_EXPIRE_SECONDS: int = 60
+    SRB_DRAFT_CACHE_EXPIRE_SECONDS: int = 30
+    SRB_VIEWS_FLUSH_SECONDS: int = 10
+    SRB_VIEWS_FLUSH_BATCH_SIZE: int = 500
+    SRB_VIEWS_COUNT_READERS: bool = True
+    SRB_DRAFT_SNAPSHOT_INTERVAL: int = 20
+    SRB_DRAFT_REVISIONS_RETENTION_DAYS: int = 30
+    SRB_SSE_MAX_SUBSCRIBERS: int = 1000  # per worker
+    SRB_SSE_QUEUE_SIZE: int = 64
+    SRB_SSE_KEEPALIVE_SECONDS: int = 15
     model_config = SettingsConfigDict(env_file=".env", env_file_encoding="utf-8")
 
     @property
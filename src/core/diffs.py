@@ -0,0 +1,44 @@
+"""Text deltas as lists of ``[start, end, text]`` edits.
+
+An edit replaces the characters ``[start, end)`` of a text with ``text``; the
+edits of one delta are sorted, do not overlap and are all relative to the same
+text, the way the drafts PATCH endpoint receives them.
+"""
+
+import difflib
+from itertools import accumulate
+
+Edit = list  # [start: int, end: int, text: str]
+
+
+def apply_edits(text: str, edits: list[Edit]) -> str:
+    parts, kept_from = [], 0
+    for start, end, new in edits:
+        parts.append(text[kept_from:start])
+        parts.append(new)
+        kept_from = end
+    parts.append(text[kept_from:])
+    return "".join(parts)
+
+
+def diff_edits(source: str, target: str) -> list[Edit]:
+    """The edits turning `source` into `target`, computed line by line"""
+    source_lines = source.splitlines(keepends=True)
+    target_lines = target.splitlines(keepends=True)
+    offsets = [0, *accumulate(map(len, source_lines))]
+
+    matcher = difflib.SequenceMatcher(None, source_lines, target_lines, autojunk=False)
+    return [
+        [offsets[i1], offsets[i2], "".join(target_lines[j1:j2])]
+        for tag, i1, i2, j1, j2 in matcher.get_opcodes()
+        if tag != "equal"
+    ]
+
+
+def invert_edits(source_slices: list[str], edits: list[Edit]) -> list[Edit]:
+    """The edits undoing `edits`, given the replaced slices of the source"""
+    inverted, shift = [], 0
+    for (start, end, new), old in zip(edits, source_slices, strict=True):
+        inverted.append([start + shift, start + shift + len(new), old])
+        shift += len(new) - (end - start)
+    return inverted
@@ -19,6 +19,7 @@ class APIPrefixesEnum(StrEnum):
     DRAFTS = "drafts"
     POSTS = "posts"
     COMMENTS = "comments"
+    TAGS = "tags"
 
 
 class UserRolesEnum(StrEnum):
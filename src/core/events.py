@@ -0,0 +1,108 @@
+import asyncio
+import json
+from collections import defaultdict
+from contextlib import suppress
+from typing import Annotated
+
+import redis
+from fastapi import Depends
+
+from src.core.config import settings
+from src.core.exceptions import TooManySubscribersError
+from src.core.redis_db import RedisClient, get_redis_client
+from src.core.utils import asingleton
+
+COMMENT_EVENTS_PATTERN = "comments:*:events"
+
+
+def comment_events_channel(post_id: int) -> str:
+    return f"comments:{post_id}:events"
+
+
+def comment_event(type_: str, comment_id: int, parent_id: int | None = None) -> str:
+    return json.dumps(
+        {"type": type_, "id": comment_id, "parent_id": parent_id},
+        separators=(",", ":"),
+    )
+
+
+class CommentEventBroker:
+    """Fan comment events out to the event streams of this worker
+
+    Each worker holds a single pattern subscription on Redis and hands every
+    message to the bounded queues of the local subscribers of that post.
+    A subscriber which does not keep up is dropped (it receives `None`) instead
+    of letting its queue grow; the client is expected to reconnect and refetch.
+    """
+
+    def __init__(self, redis_client: RedisClient, max_subscribers: int, queue_size: int):
+        self.redis_client = redis_client
+        self.max_subscribers = max_subscribers
+        self.queue_size = queue_size
+        self._subscribers: dict[int, set[asyncio.Queue]] = defaultdict(set)
+        self._count = 0
+        self._listener: asyncio.Task | None = None
+
+    def subscribe(self, post_id: int) -> asyncio.Queue:
+        if self._count >= self.max_subscribers:
+            raise TooManySubscribersError()
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        self._subscribers[post_id].add(queue)
+        self._count += 1
+        if self._listener is None or self._listener.done():
+            self._listener = asyncio.create_task(self._listen())
+        return queue
+
+    def unsubscribe(self, post_id: int, queue: asyncio.Queue):
+        queues = self._subscribers.get(post_id)
+        if queues is None or queue not in queues:
+            return
+        queues.discard(queue)
+        self._count -= 1
+        if not queues:
+            del self._subscribers[post_id]
+
+    def dispatch(self, post_id: int, event: bytes | str):
+        for queue in list(self._subscribers.get(post_id, ())):
+            try:
+                queue.put_nowait(event)
+            except asyncio.QueueFull:
+                # slow consumer, make room for the sentinel and let it go
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(None)
+                self.unsubscribe(post_id, queue)
+
+    async def close(self):
+        if self._listener is not None:
+            self._listener.cancel()
+            # let the listener close its pubsub connection
+            with suppress(asyncio.CancelledError):
+                await self._listener
+            self._listener = None
+
+    async def _listen(self):
+        while True:
+            pubsub = self.redis_client.pubsub()
+            try:
+                await pubsub.psubscribe(COMMENT_EVENTS_PATTERN)
+                async for message in pubsub.listen():
+                    if message["type"] != "pmessage":
+                        continue
+                    post_id = int(message["channel"].split(b":")[1])
+                    self.dispatch(post_id, message["data"])
+            except (redis.exceptions.ConnectionError, ConnectionError):
+                await asyncio.sleep(1)
+            finally:
+                await pubsub.aclose()
+
+
+@asingleton
+async def get_comment_event_broker(
+    redis_client: Annotated[RedisClient, Depends(get_redis_client)],
+) -> CommentEventBroker:
+    return CommentEventBroker(
+        redis_client,
+        max_subscribers=settings.SRB_SSE_MAX_SUBSCRIBERS,
+        queue_size=settings.SRB_SSE_QUEUE_SIZE,
+    )
@@ -34,6 +34,16 @@ class CommentNotFoundError(ResourceNotFoundError):
         self.message = f"<Comment:{comment_id} is not found!"
 
 
+class TagNotFoundError(ResourceNotFoundError):
+    def __init__(self, tag):
+        self.message = f"<Tag:{tag!r}> is not found!"
+
+
+class DraftRevisionNotFoundError(ResourceNotFoundError):
+    def __init__(self, draft_id, revision):
+        self.message = f"<Draft:{draft_id}> revision {revision} is not found!"
+
+
 class BadRequestError(Error):
     code = HTTPStatus.BAD_REQUEST.value
     code_message = HTTPStatus.BAD_REQUEST.description
@@ -49,6 +59,16 @@ class DraftPublishedBeforeError(BadRequestError):
         self.message = f"<Draft:{draft_id}> is published before!"
 
 
+class InvalidCursorError(BadRequestError):
+    def __init__(self, cursor):
+        self.message = f"cursor: {cursor!r} is not valid!"
+
+
+class InvalidDraftEditError(BadRequestError):
+    def __init__(self, draft_id):
+        self.message = f"<Draft:{draft_id}> edits are out of the body's range!"
+
+
 class UnAuthorizedError(Error):
     code = HTTPStatus.UNAUTHORIZED.value
     code_message = HTTPStatus.UNAUTHORIZED.description
@@ -83,3 +103,32 @@ class DatabaseConnectionError(DatabaseError):
 class ForbiddenError(Error):
     code = HTTPStatus.FORBIDDEN
     code_message = HTTPStatus.FORBIDDEN.description
+
+
+class ConflictError(Error):
+    code = HTTPStatus.CONFLICT
+    code_message = HTTPStatus.CONFLICT.description
+
+
+class DraftRevisionConflictError(ConflictError):
+    def __init__(self, draft_id, revision):
+        self.message = f"<Draft:{draft_id}> is not at revision {revision} anymore!"
+
+
+class PreconditionFailedError(Error):
+    code = HTTPStatus.PRECONDITION_FAILED
+    code_message = HTTPStatus.PRECONDITION_FAILED.description
+
+
+class DraftPreconditionFailedError(PreconditionFailedError):
+    def __init__(self, draft_id):
+        self.message = f"<Draft:{draft_id}> does not match If-Match anymore!"
+
+
+class ServiceUnavailableError(Error):
+    code = HTTPStatus.SERVICE_UNAVAILABLE
+    code_message = HTTPStatus.SERVICE_UNAVAILABLE.description
+
+
+class TooManySubscribersError(ServiceUnavailableError):
+    message = "Too many event stream subscribers, try again later"
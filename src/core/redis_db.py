@@ -43,6 +43,40 @@ class RedisClient:
         else:
             await self.redis.set(name, value, ex=timeout)
 
+    async def incr(self, name, amount: int = 1) -> int:
+        return await self.redis.incr(name, amount)
+
+    async def multi(self, *commands: tuple) -> list:
+        """Run `(command, *args)` tuples in order in one MULTI/EXEC round trip,
+        e.g. `multi(("incr", "a"), ("sadd", "b", 1))`
+        """
+        async with self.redis.pipeline(transaction=True) as pipe:
+            for command, *args in commands:
+                getattr(pipe, command)(*args)
+            return await pipe.execute()
+
+    async def getdel(self, name, default=None):
+        got = await self.redis.getdel(name)
+        return default if got is None else self._serializer.loads(got)
+
+    async def sadd(self, name, *values) -> int:
+        return await self.redis.sadd(name, *values)
+
+    async def spop(self, name, count: int) -> list[bytes]:
+        return await self.redis.spop(name, count)
+
+    async def pfadd(self, name, *values) -> int:
+        return await self.redis.pfadd(name, *values)
+
+    async def pfcount(self, name) -> int:
+        return await self.redis.pfcount(name)
+
+    async def publish(self, channel: str, message: str) -> int:
+        return await self.redis.publish(channel, message)
+
+    def pubsub(self):
+        return self.redis.pubsub()
+
     async def delete(self, *names):
         return bool(await self.redis.delete(*names))
 
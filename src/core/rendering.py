@@ -0,0 +1,124 @@
+"""A small markdown subset rendered to safe HTML.
+
+Supported: ATX headings, paragraphs, blockquotes, ``-``/``*`` and numbered
+lists, fenced code blocks, horizontal rules, ``code``, ``**strong**``,
+``*emphasis*``/``_emphasis_`` and ``[links](https://...)``.
+
+Safety comes from the order of the work: the whole text is HTML-escaped first
+and only then are the tags of the subset added, so no markup of the author
+can get through; link targets are limited to a few schemes.
+"""
+
+import html
+import re
+
+_FENCE = re.compile(r"^```")
+_HEADING = re.compile(r"^(#{1,6})\s+(.*?)\s*#*$")
+_HR = re.compile(r"^(?:-{3,}|\*{3,}|_{3,})$")
+_QUOTE = re.compile(r"^&gt; ?(.*)$")
+_UL_ITEM = re.compile(r"^[-*]\s+(.*)$")
+_OL_ITEM = re.compile(r"^\d+[.)]\s+(.*)$")
+
+_STRONG = re.compile(r"\*\*(?=\S)(.+?)(?<=\S)\*\*")
+_EM = re.compile(r"(?<![\w*])[*_](?=\S)(.+?)(?<=\S)[*_](?![\w*])")
+# a code span or a link, whichever starts first
+_SPAN = re.compile(r"`(?P<code>[^`]+)`|\[(?P<text>[^\]]+)\]\((?P<url>[^)\s]+)\)")
+# `//host` and `/\host` point to another host, they are not paths
+_SAFE_URL = re.compile(r"^(?:https?://|mailto:|/(?![/\\])|#)", re.IGNORECASE)
+
+
+def _emphasis(text: str) -> str:
+    text = _STRONG.sub(r"<strong>\1</strong>", text)
+    return _EM.sub(r"<em>\1</em>", text)
+
+
+def _link(text: str, url: str) -> str:
+    # the href is the url as written, only the text is formatted
+    if not _SAFE_URL.match(html.unescape(url)):
+        return _inline(text)
+    return f'<a href="{url}" rel="nofollow noopener">{_inline(text)}</a>'
+
+
+def _inline(text: str) -> str:
+    # code spans and links are cut out first, so nothing is formatted inside
+    # them (or across an href)
+    spans: list[str] = []
+
+    def stash(match: re.Match) -> str:
+        if match["code"] is not None:
+            spans.append(f"<code>{match['code']}</code>")
+        else:
+            spans.append(_link(match["text"], match["url"]))
+        return f"\x00{len(spans) - 1}\x00"
+
+    text = _emphasis(_SPAN.sub(stash, text))
+    return re.sub(r"\x00(\d+)\x00", lambda m: spans[int(m.group(1))], text)
+
+
+def render_markdown(text: str) -> str:
+    lines = html.escape(text.replace("\x00", "")).splitlines()
+    out: list[str] = []
+    paragraph: list[str] = []
+    list_tag: str | None = None
+
+    def close_paragraph():
+        if paragraph:
+            out.append(f"<p>{_inline(' '.join(paragraph))}</p>")
+            paragraph.clear()
+
+    def close_list():
+        nonlocal list_tag
+        if list_tag is not None:
+            out.append(f"</{list_tag}>")
+            list_tag = None
+
+    idx = 0
+    while idx < len(lines):
+        line = lines[idx].rstrip()
+        stripped = line.strip()
+        idx += 1
+
+        if _FENCE.match(stripped):
+            close_paragraph()
+            close_list()
+            code: list[str] = []
+            while idx < len(lines) and not _FENCE.match(lines[idx].strip()):
+                code.append(lines[idx])
+                idx += 1
+            idx += 1  # the closing fence
+            out.append("<pre><code>{}</code></pre>".format("\n".join(code)))
+            continue
+
+        if not stripped:
+            close_paragraph()
+            close_list()
+            continue
+
+        if match := _HEADING.match(stripped):
+            close_paragraph()
+            close_list()
+            level = len(match.group(1))
+            out.append(f"<h{level}>{_inline(match.group(2))}</h{level}>")
+        elif _HR.match(stripped):
+            close_paragraph()
+            close_list()
+            out.append("<hr>")
+        elif match := _QUOTE.match(stripped):
+            close_paragraph()
+            close_list()
+            out.append(f"<blockquote><p>{_inline(match.group(1))}</p></blockquote>")
+        elif (match := _UL_ITEM.match(stripped)) or (match := _OL_ITEM.match(stripped)):
+            close_paragraph()
+            tag = "ul" if _UL_ITEM.match(stripped) else "ol"
+            if list_tag != tag:
+                close_list()
+                out.append(f"<{tag}>")
+                list_tag = tag
+            out.append(f"<li>{_inline(match.group(1))}</li>")
+        else:
+            close_list()
+            paragraph.append(stripped)
+
+    close_paragraph()
+    close_list()
+    return "\n".join(out)
@@ -1,8 +1,17 @@
 from datetime import datetime
-from typing import Annotated, TypeAlias
+from typing import Annotated, Literal, TypeAlias
 
 import slugify
-from pydantic import BaseModel, EmailStr, constr, AfterValidator, conset
+from pydantic import (
+    BaseModel,
+    EmailStr,
+    constr,
+    AfterValidator,
+    conset,
+    conint,
+    conlist,
+    model_validator,
+)
 
 from src.core.enums import UserRolesEnum, APIMethodsEnum
 
@@ -58,6 +67,7 @@ LinkTupleType: TypeAlias = tuple[APIMethodsEnum, str] | None
 class LittleDraftSchema(BaseModel):
     id: int
     title: str
+    created: datetime
     updated: datetime | None
     link: LinkTupleType
 
@@ -70,6 +80,7 @@ class DraftSchema(BaseModel):
     updated: datetime | None
     username: str
     draft_hash: str
+    revision: int
 
 
 class CreateDraftSchema(BaseModel):
@@ -82,6 +93,55 @@ class UpdateDraftSchema(BaseModel):
     body: str
 
 
+class DraftEditSchema(BaseModel):
+    """Replace the characters [start, end) of the body with `text`"""
+
+    start: conint(ge=0)
+    end: conint(ge=0)
+    text: str = ""
+
+    @model_validator(mode="after")
+    def _check_range(self):
+        if self.end < self.start:
+            raise ValueError("end must not be before start")
+        return self
+
+
+class PatchDraftSchema(BaseModel):
+    revision: int
+    title: str | None = None
+    edits: conlist(DraftEditSchema, max_length=256) = []
+
+    @model_validator(mode="after")
+    def _check_overlaps(self):
+        # every offset is relative to `revision`, so the ranges can not overlap
+        edits = sorted(self.edits, key=lambda edit: (edit.start, edit.end))
+        for before, after in zip(edits, edits[1:]):
+            if after.start < before.end:
+                raise ValueError("edits must not overlap")
+        self.edits = edits
+        return self
+
+
+class DraftRevisionSchema(BaseModel):
+    revision: int
+    updated: datetime
+
+
+class LittleDraftRevisionSchema(BaseModel):
+    revision: int
+    title: str
+    created: datetime
+    is_snapshot: bool
+
+
+class DraftRevisionBodySchema(BaseModel):
+    revision: int
+    title: str
+    body: str
+    created: datetime
+
+
 def _slugify(slug) -> str:
     return slugify.slugify(slug)
 
@@ -101,14 +161,21 @@ class PublishDraftSchema(BaseModel):
     slug: Slug
 
 
+BodyFormat: TypeAlias = Literal["markdown", "html"]
+
+
 class PostSchema(BaseModel):
     id: int
     title: str
     body: str
+    body_format: BodyFormat = "markdown"
     tags: set[str]
     published: datetime
     updated: datetime | None = None
     comments_count: int
+    # as of when the post page was cached, they lag by up to its TTL
+    views: int
+    readers: int
 
 
 class CreateCommentReplySchema(BaseModel):
@@ -126,8 +193,20 @@ class CommentReplySchema(BaseModel):
     reply_count: int
 
 
+class CommentTreeSchema(CommentReplySchema):
+    replies: list["CommentTreeSchema"] = []
+
+
 class LittlePostSchema(BaseModel):
     id: int
     title: str
     slug: str
+    username: str
     published: datetime
+    excerpt: str
+    tags: set[str]
+
+
+class SearchResultSchema(LittlePostSchema):
+    snippet: str
+    rank: float
@@ -1,13 +1,16 @@
 import asyncio
 import base64
+import binascii
 import functools
 import hashlib
 import io
+import json
 from typing import NamedTuple
 
 import qrcode
 from pyotp import totp
 
+from src.core.exceptions import InvalidCursorError
 from src.core.schemas import UserSchema
 
 
@@ -41,6 +44,32 @@ def sha256_username(username):
     return hashlib.sha256(username.encode()).hexdigest()
 
 
+def make_excerpt(text: str, length: int = 200) -> str:
+    """First `length` characters of `text`, cut on a word boundary"""
+    text = " ".join(text.split())
+    if len(text) <= length:
+        return text
+    cut = text[:length].rsplit(" ", 1)[0] or text[:length]
+    return f"{cut}…"
+
+
+def encode_cursor(*values) -> str:
+    """Pack the sort key of the last seen row into an opaque url-safe string"""
+    raw = json.dumps(values, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> list:
+    padded = cursor + "=" * (-len(cursor) % 4)
+    try:
+        values = json.loads(base64.urlsafe_b64decode(padded))
+    except (ValueError, binascii.Error):
+        raise InvalidCursorError(cursor) from None
+    if not isinstance(values, list):
+        raise InvalidCursorError(cursor)
+    return values
+
+
 class HTTP(NamedTuple):
     scheme: str
     in_: str
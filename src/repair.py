@@ -0,0 +1,36 @@
+"""Recompute the denormalized counters from the source tables and render
+the posts which have no body_html yet.
+
+Run it with ``python -m src.repair`` (or ``just repair-counters``) after a
+restore, a manual data fix or anything else that bypassed the repositories;
+``python -m src.repair --render-all`` also re-renders every post, after a
+change of src.core.rendering.
+"""
+
+import asyncio
+import sys
+
+from src.core.database import AEngine, ASession
+from src.repository.comment_repo import CommentReplyRepo
+from src.repository.post_repo import PostRepo
+from src.repository.tag_repo import TagRepo
+from src.repository.unitofwork import UnitOfWork
+
+
+async def repair_counters(render_all: bool = False):
+    async with UnitOfWork(ASession) as session:
+        replies = await CommentReplyRepo(session).recount_replies()
+        comments = await PostRepo(session).recount_comments()
+        posts = await PostRepo(session).recount_posts()
+        tags = await TagRepo(session).recount_posts()
+        rendered = await PostRepo(session).render_bodies(everything=render_all)
+    print(f"comments.reply_count repaired: {replies}")
+    print(f"posts.comments_count repaired: {comments}")
+    print(f"users.posts_count repaired: {posts}")
+    print(f"tags.posts_count repaired: {tags}")
+    print(f"posts.body_html rendered: {rendered}")
+    await AEngine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(repair_counters(render_all="--render-all" in sys.argv[1:]))
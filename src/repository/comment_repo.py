@@ -1,14 +1,24 @@
+from datetime import datetime
 from typing import Literal
 
-from sqlalchemy import insert, update, select, String, desc, func, text
-from sqlalchemy.exc import IntegrityError
+from sqlalchemy import (
+    delete,
+    insert,
+    update,
+    select,
+    Select,
+    String,
+    desc,
+    tuple_,
+    func,
+    literal,
+    null,
+)
 from sqlalchemy.orm import aliased
 from sqlalchemy.sql import expression
-from sqlalchemy_utils import Ltree
-from sqlalchemy_utils.types.ltree import LQUERY
 
 from src.core.exceptions import PostNotFoundError, CommentNotFoundError
-from src.core.schemas import CommentReplySchema
+from src.core.schemas import CommentReplySchema, CommentTreeSchema
 from src.repository import BaseRepo
 from src.repository.models import CommentModel, PostModel
 
@@ -17,56 +27,88 @@ class CommentReplyRepo(BaseRepo):
     model = CommentModel
 
     async def add(self, comment_data: dict) -> CommentReplySchema:
-        post_id = comment_data["post_id"]
-        await self._check_post_existence(post_id)
+        """Insert a comment (or reply) with a single statement
 
-        stmt = (
-            insert(self.model)
-            .values(**comment_data)
-            .returning(self.model.id, self.model.parent_id)
-        )
+        The id is taken from the sequence up front so that the ltree path can be
+        computed in the same INSERT ... SELECT. For replies the parent row is
+        joined in (which also proves the post exists). The reply_count of the
+        parent, or the comments_count of the post for top-level comments, is
+        bumped in a data-modifying CTE.
+        """
+        post_id, parent_id = comment_data["post_id"], comment_data["parent_id"]
 
-        try:
-            comment = await self.execute_mappings_fetchone(stmt)
-        except IntegrityError:
-            raise CommentNotFoundError(comment_data["parent_id"])
+        new_id = select(
+            func.nextval(
+                func.pg_get_serial_sequence(self.model.__tablename__, "id")
+            ).label("id")
+        ).subquery("new_id")
+        self_path = func.text2ltree(expression.cast(new_id.c.id, String))
+
+        values = {
+            name: literal(value, self.model.__table__.c[name].type)
+            for name, value in comment_data.items()
+            if name not in ("post_id", "parent_id")
+        }
+        if parent_id is None:
+            source = select(
+                new_id.c.id,
+                self_path.label("path"),
+                PostModel.id.label("post_id"),
+                null().label("parent_id"),
+                *(value.label(name) for name, value in values.items()),
+            ).join(PostModel, PostModel.id == post_id)
         else:
-            cmt_id = comment["id"]
+            parent = aliased(self.model, name="parent")
+            source = select(
+                new_id.c.id,
+                parent.path.op("||")(self_path).label("path"),
+                parent.post_id,
+                parent.id.label("parent_id"),
+                *(value.label(name) for name, value in values.items()),
+            ).join(parent, (parent.id == parent_id) & (parent.post_id == post_id))
 
-            add_path_stmt = (
+        inserted = (
+            insert(self.model)
+            .from_select(["id", "path", "post_id", "parent_id", *values], source)
+            .returning(
+                self.model.id,
+                self.model.commented,
+                self.model.comment,
+                expression.cast(self.model.path, String).label("path"),
+                self.model.updated,
+                self.model.parent_id,
+                self.model.username,
+                self.model.reply_count,
+            )
+            .cte("inserted")
+        )
+        if parent_id is None:
+            bump_counter = (
+                update(PostModel)
+                .where(PostModel.id == post_id)
+                .where(select(inserted.c.id).exists())
+                .values(comments_count=PostModel.comments_count + 1)
+                .cte("bump_post")
+            )
+        else:
+            bump_counter = (
                 update(self.model)
-                .where(self.model.id == cmt_id)
-                .returning(
-                    self.model.id,
-                    self.model.commented,
-                    self.model.comment,
-                    expression.cast(self.model.path, String),
-                    self.model.updated,
-                    self.model.parent_id,
-                    self.model.username,
-                )
+                .where(self.model.id == select(inserted.c.parent_id).scalar_subquery())
+                .values(reply_count=self.model.reply_count + 1)
+                .cte("bump_parent")
             )
-            if comment["parent_id"] is None:
-                # it s a comment
-                add_path_stmt = add_path_stmt.values(path=Ltree(str(cmt_id)))
-            else:
-                # it is reply
-                # new_path = parent_path.self_path
-                parent_path = (
-                    await self.session.execute(
-                        select(self.model.path).where(
-                            self.model.id == comment["parent_id"]
-                        )
-                    )
-                ).scalar_one()
-                add_path_stmt = add_path_stmt.values(
-                    path=Ltree(parent_path) + Ltree(str(cmt_id))
-                )
-
-            comment = await self.execute_mappings_fetchone(add_path_stmt)
-            return CommentReplySchema(**comment, reply_count=0)
+        stmt = select(inserted).add_cte(bump_counter)
+
+        comment = await self.execute_mappings_fetchone(stmt)
+        if comment is not None:
+            return CommentReplySchema(**comment)
+        if parent_id is None:
+            raise PostNotFoundError(post_id)
+        await self._check_post_existence(post_id)
+        raise CommentNotFoundError(parent_id)
 
     async def _check_post_existence(self, post_id):
+        # only used to tell "post is missing" from "no rows" on the empty path
         if (
             await self.session.execute(
                 select(PostModel.id).where(PostModel.id == post_id)
@@ -81,40 +123,39 @@ class CommentReplyRepo(BaseRepo):
         how_many: int,
         order: Literal["first", "last", "most_replied"],
         parent_id: int | None = None,
+        after: tuple[datetime | int, int] | None = None,
     ) -> list[CommentReplySchema]:
-        await self._check_post_existence(post_id)
+        """Return a page of comments (or replies of `parent_id`)
 
-        _order = None
+        If `after` (the sort key and id of the last seen row) is given, the
+        page is sought right after that row instead of being reached with OFFSET.
+        """
+        stmt = self._page_stmt(post_id, page, how_many, order, parent_id, after)
+        comments = await self.execute_mappings_fetchall(stmt)
+        if not comments:
+            await self._check_post_existence(post_id)
+        return [CommentReplySchema(**comment) for comment in comments]
+
+    def _page_stmt(
+        self,
+        post_id: int,
+        page: int,
+        how_many: int,
+        order: Literal["first", "last", "most_replied"],
+        parent_id: int | None = None,
+        after: tuple[datetime | int, int] | None = None,
+    ) -> Select:
+        # every order is served by one of the (post_id, parent_id, <key>, id)
+        # indexes declared on CommentModel
         c = aliased(self.model, name="c")
 
         match order:
             case "first":
-                _order = c.commented
-            case "last":
-                _order = desc(c.commented)
+                sort_key, ascending = (c.commented, c.id), True
             case "most_replied":
-                _order = desc(text("reply_count"))
+                sort_key, ascending = (c.reply_count, c.id), False
             case _:
-                _order = desc(c.commented)
-
-        c2 = aliased(self.model, name="c2")
-        sq = (
-            select(func.count("*"))
-            .select_from(c2)
-            .filter(
-                c2.path.lquery(
-                    expression.cast(
-                        func.concat(
-                            expression.cast(c.path, String),
-                            expression.cast(".*{1}", String),
-                        ),
-                        LQUERY,
-                    )
-                )
-            )
-            .scalar_subquery()
-            .label("reply_count")
-        )
+                sort_key, ascending = (c.commented, c.id), False
 
         stmt = (
             select(
@@ -125,25 +166,81 @@ class CommentReplyRepo(BaseRepo):
                 c.updated,
                 c.parent_id,
                 c.username,
-                sq,
+                c.reply_count,
             )
-            .join(PostModel, PostModel.id == post_id)
+            .where(c.post_id == post_id)
             .where(c.parent_id == parent_id)
-            .order_by(_order)
-            .offset((page - 1) * how_many)
+            .order_by(*(sort_key if ascending else map(desc, sort_key)))
             .limit(how_many)
         )
-        comments = await self.execute_mappings_fetchall(stmt)
-        return [CommentReplySchema(**comment) for comment in comments]
+        if after is None:
+            stmt = stmt.offset((page - 1) * how_many)
+        else:
+            last_seen = tuple_(*after, types=[key.type for key in sort_key])
+            if ascending:
+                stmt = stmt.where(tuple_(*sort_key) > last_seen)
+            else:
+                stmt = stmt.where(tuple_(*sort_key) < last_seen)
+        return stmt
+
+    async def get_tree(
+        self, post_id: int, comment_id: int | None = None, depth: int | None = None
+    ) -> list[CommentTreeSchema]:
+        """Fetch the comment forest of a post (or the subtree of `comment_id`)
+        with one query and nest it in a single pass.
+        """
+        stmt = (
+            select(
+                self.model.id,
+                self.model.commented,
+                self.model.comment,
+                expression.cast(self.model.path, String),
+                self.model.updated,
+                self.model.parent_id,
+                self.model.username,
+                self.model.reply_count,
+            )
+            .where(self.model.post_id == post_id)
+            # parents always come before their children
+            .order_by(func.nlevel(self.model.path), self.model.commented, self.model.id)
+        )
+        level = func.nlevel(self.model.path)
+        if comment_id is not None:
+            root = aliased(self.model, name="root")
+            root_path = (
+                select(root.path)
+                .where(root.id == comment_id)
+                .where(root.post_id == post_id)
+                .scalar_subquery()
+            )
+            stmt = stmt.where(self.model.path.descendant_of(root_path))
+            level = level - func.nlevel(root_path) + 1
+        if depth is not None:
+            stmt = stmt.where(level <= depth)
+
+        rows = await self.execute_mappings_fetchall(stmt)
+        if not rows:
+            await self._check_post_existence(post_id)
+            if comment_id is not None:
+                raise CommentNotFoundError(comment_id)
+            return []
+
+        nodes: dict[int, CommentTreeSchema] = {}
+        tree: list[CommentTreeSchema] = []
+        for row in rows:
+            node = CommentTreeSchema(**row)
+            nodes[node.id] = node
+            parent = nodes.get(node.parent_id)
+            (tree if parent is None else parent.replies).append(node)
+        return tree
 
     async def update(
         self, comment_data: dict, comment_id: int, post_id: int
     ) -> CommentReplySchema:
-        await self._check_post_existence(post_id)
-
         stmt = (
             update(self.model)
             .where(self.model.id == comment_id)
+            .where(self.model.post_id == post_id)
             .values(**comment_data)
             .returning(
                 self.model.id,
@@ -153,33 +250,64 @@ class CommentReplyRepo(BaseRepo):
                 self.model.updated,
                 self.model.parent_id,
                 self.model.username,
-            )
-        )
-        sq = (
-            select(func.count("*"))
-            .select_from(self.model)
-            .filter(
-                self.model.path.lquery(
-                    expression.cast(
-                        expression.cast(f"{comment_id}" + ".*{1}", String),
-                        LQUERY,
-                    )
-                )
+                self.model.reply_count,
             )
         )
         comment = await self.execute_mappings_fetchone(stmt)
         if comment is not None:
-            reply_count = (await self.session.execute(sq)).scalar_one()
-            return CommentReplySchema(**comment, reply_count=reply_count)
+            return CommentReplySchema(**comment)
+        await self._check_post_existence(post_id)
         raise CommentNotFoundError(comment_id)
 
-    async def delete(self, post_id: int, comment_id: int):
-        await self._check_post_existence(post_id)
-        comment: CommentModel = (
-            await self.session.execute(
-                select(self.model).where(self.model.id == comment_id)
-            )
-        ).scalar_one_or_none()
-        if comment is None:
+    async def delete(self, post_id: int, comment_id: int) -> int:
+        """Delete the comment with its whole subtree and return how many rows
+        were removed
+        """
+        target = (
+            select(self.model.path, self.model.parent_id)
+            .where(self.model.id == comment_id)
+            .where(self.model.post_id == post_id)
+            .cte("target")
+        )
+        removed = (
+            delete(self.model)
+            .where(self.model.path.descendant_of(select(target.c.path).scalar_subquery()))
+            .returning(self.model.id)
+            .cte("removed")
+        )
+        bump_parent = (
+            update(self.model)
+            .where(self.model.id == select(target.c.parent_id).scalar_subquery())
+            .values(reply_count=self.model.reply_count - 1)
+            .cte("bump_parent")
+        )
+        bump_post = (
+            update(PostModel)
+            .where(PostModel.id == post_id)
+            .where(select(target.c.path).where(target.c.parent_id == None).exists())  # noqa: E711
+            .values(comments_count=PostModel.comments_count - 1)
+            .cte("bump_post")
+        )
+        stmt = select(func.count()).select_from(removed).add_cte(bump_parent, bump_post)
+
+        removed_count = (await self.session.execute(stmt)).scalar_one()
+        if removed_count == 0:
+            await self._check_post_existence(post_id)
             raise CommentNotFoundError(comment_id)
-        await self.session.delete(comment)
+        return removed_count
+
+    async def recount_replies(self) -> int:
+        """Repair reply_count of the comments which drifted, return how many"""
+        child = aliased(self.model, name="child")
+        actual = (
+            select(func.count())
+            .select_from(child)
+            .where(child.parent_id == self.model.id)
+            .scalar_subquery()
+        )
+        stmt = (
+            update(self.model)
+            .where(self.model.reply_count != actual)
+            .values(reply_count=actual)
+        )
+        return (await self.session.execute(stmt)).rowcount
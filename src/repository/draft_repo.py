@@ -1,21 +1,43 @@
+import operator
 from datetime import datetime
+from functools import reduce
 from zoneinfo import ZoneInfo
 
-from sqlalchemy import insert, select, Select, desc, update
+from sqlalchemy import (
+    select,
+    Select,
+    desc,
+    update,
+    func,
+    String,
+    literal,
+    tuple_,
+)
+from sqlalchemy.dialects.postgresql import insert
 
-from src.core.exceptions import DraftNotFoundError, ResourceNotFoundError
-from src.core.schemas import DraftSchema, LittleDraftSchema
+from src.core.exceptions import (
+    DraftNotFoundError,
+    DraftPreconditionFailedError,
+    ResourceNotFoundError,
+    DraftRevisionConflictError,
+    InvalidDraftEditError,
+)
+from src.core.diffs import diff_edits, invert_edits
+from src.core.schemas import DraftSchema, LittleDraftSchema, DraftRevisionSchema
 from src.repository import BaseRepo
-from src.repository.models import DraftModel, UserModel
+from src.repository.draft_revision_repo import DraftRevisionRepo
+from src.repository.models import DraftModel
 
 
 class DraftRepo(BaseRepo):
     model = DraftModel
 
-    async def add(self, draft: dict) -> DraftSchema:
+    async def add(self, draft: dict) -> DraftSchema | None:
+        """Insert the draft, None if its draft_hash is already taken"""
         stmt = (
             insert(self.model)
             .values(**draft)
+            .on_conflict_do_nothing(index_elements=[self.model.draft_hash])
             .returning(
                 self.model.id,
                 self.model.created,
@@ -24,15 +46,16 @@ class DraftRepo(BaseRepo):
                 self.model.updated,
                 self.model.username,
                 self.model.draft_hash,
+                self.model.revision,
             )
         )
         draft = await self.execute_mappings_fetchone(stmt)
-        return DraftSchema(**draft)
+        if draft is not None:
+            return DraftSchema(**draft)
 
     async def get(self, draft_id: int, username: str) -> DraftSchema:
         stmt = (
             self._select_all_columns()
-            .join(UserModel)
             .where(self.model.username == username)
             .where(self.model.id == draft_id)
             .where(self.model.is_published == False)  # noqa: E712
@@ -42,30 +65,71 @@ class DraftRepo(BaseRepo):
             return DraftSchema(**raw_draft)
         raise DraftNotFoundError(draft_id=draft_id)
 
-    async def get_all(self, username: str, desc_order: bool) -> list[LittleDraftSchema]:
+    async def get_all(
+        self,
+        username: str,
+        desc_order: bool,
+        how_many: int,
+        after: tuple[datetime, int] | None = None,
+    ) -> list[LittleDraftSchema]:
+        # a range scan of ix_drafts_username_created_unpublished, forward or
+        # backward, which stops after `how_many` rows
+        sort_key = (self.model.created, self.model.id)
         stmt = (
             select(
                 self.model.id,
                 self.model.title,
+                self.model.created,
                 self.model.updated,
             )
-            .join(UserModel)
             .where(self.model.username == username)
             .where(self.model.is_published == False)  # noqa: E712
-            .order_by(
-                desc(self.model.created) if desc_order else self.model.created,
-            )
+            .order_by(*(map(desc, sort_key) if desc_order else sort_key))
+            .limit(how_many)
         )
+        if after is not None:
+            last_seen = tuple_(*after, types=[key.type for key in sort_key])
+            seek = (
+                tuple_(*sort_key) < last_seen
+                if desc_order
+                else tuple_(*sort_key) > last_seen
+            )
+            stmt = stmt.where(seek)
         raw_drafts = await self.execute_mappings_fetchall(stmt)
         return [LittleDraftSchema(**draft, link=None) for draft in raw_drafts]
 
-    async def update(self, draft_id: int, draft: dict, username: str) -> DraftSchema:
-        stmt = (
-            update(self.model)
-            .values(**draft, updated=datetime.now(tz=ZoneInfo("UTC")))
+    async def update(
+        self,
+        draft_id: int,
+        draft: dict,
+        username: str,
+        revisions: list[int] | None = None,
+    ) -> DraftSchema:
+        """Replace the draft, only if it is at one of `revisions` when given"""
+        # the row as it was, locked so it is the version this update replaces
+        old = (
+            select(
+                self.model.id,
+                self.model.title,
+                self.model.body,
+                func.coalesce(self.model.updated, self.model.created).label("saved"),
+            )
             .where(self.model.username == username)
             .where(self.model.id == draft_id)
             .where(self.model.is_published == False)  # noqa: E712
+            .with_for_update()
+        )
+        if revisions is not None:
+            old = old.where(self.model.revision.in_(revisions))
+        old = old.cte("old")
+        stmt = (
+            update(self.model)
+            .values(
+                **draft,
+                updated=datetime.now(tz=ZoneInfo("UTC")),
+                revision=self.model.revision + 1,
+            )
+            .where(self.model.id == old.c.id)
             .returning(
                 self.model.id,
                 self.model.created,
@@ -74,12 +138,139 @@ class DraftRepo(BaseRepo):
                 self.model.updated,
                 self.model.username,
                 self.model.draft_hash,
+                self.model.revision,
+                old.c.title.label("old_title"),
+                old.c.body.label("old_body"),
+                old.c.saved,
             )
         )
         draft = await self.execute_mappings_fetchone(stmt)
-        if draft is not None:
-            return DraftSchema(**draft)
-        raise DraftNotFoundError(draft_id=draft_id)
+        if draft is None:
+            if revisions is not None and await self._exists(draft_id, username):
+                raise DraftPreconditionFailedError(draft_id)
+            raise DraftNotFoundError(draft_id=draft_id)
+
+        old_title, old_body, saved = (
+            draft.pop(k) for k in ("old_title", "old_body", "saved")
+        )
+        old_revision = draft["revision"] - 1
+        revisions = DraftRevisionRepo(self.session)
+        if revisions.is_snapshot(old_revision):
+            await revisions.add(draft_id, old_revision, old_title, saved, body=old_body)
+        else:
+            delta = diff_edits(draft["body"], old_body)
+            await revisions.add(draft_id, old_revision, old_title, saved, delta=delta)
+        return DraftSchema(**draft)
+
+    async def patch(
+        self,
+        draft_id: int,
+        username: str,
+        revision: int,
+        edits: list[dict],
+        title: str | None = None,
+    ) -> DraftRevisionSchema:
+        """Splice `edits` (sorted, non-overlapping, relative to `revision`)
+        into the body inside Postgres, so the body never leaves the database
+        """
+        revisions = DraftRevisionRepo(self.session)
+        snapshot = revisions.is_snapshot(revision)
+
+        # the row as it was, with the slices the edits replace, to keep the
+        # reverse delta (or the whole body for a snapshot) of `revision`
+        old_columns = [
+            func.substr(self.model.body, edit["start"] + 1, edit["end"] - edit["start"])
+            for edit in edits
+        ]
+        old = (
+            select(
+                self.model.id,
+                self.model.title,
+                func.coalesce(self.model.updated, self.model.created).label("saved"),
+                *(column.label(f"slice_{idx}") for idx, column in enumerate(old_columns)),
+                *([self.model.body] if snapshot else []),
+            )
+            .where(self.model.username == username)
+            .where(self.model.id == draft_id)
+            .where(self.model.is_published == False)  # noqa: E712
+            .where(self.model.revision == revision)
+            .with_for_update()
+        )
+        if edits:
+            end = max(edit["end"] for edit in edits)
+            old = old.where(func.char_length(self.model.body) >= end)
+        old = old.cte("old")
+
+        # the kept slices of the old body with the new texts between them
+        parts, kept_from = [], 0
+        for edit in edits:
+            parts.append(
+                func.substr(
+                    self.model.body,
+                    kept_from + 1,
+                    edit["start"] - kept_from,
+                    type_=String,
+                )
+            )
+            parts.append(literal(edit["text"], String))
+            kept_from = edit["end"]
+        parts.append(func.substr(self.model.body, kept_from + 1, type_=String))
+        # chained ||, a function call such as concat() takes at most 100 arguments
+        body = reduce(operator.add, parts) if edits else self.model.body
+
+        values = {
+            "body": body,
+            "updated": datetime.now(tz=ZoneInfo("UTC")),
+            "revision": self.model.revision + 1,
+        }
+        if title is not None:
+            values["title"] = title
+
+        stmt = (
+            update(self.model)
+            .values(**values)
+            .where(self.model.id == old.c.id)
+            .returning(
+                self.model.revision,
+                self.model.updated,
+                *(column for name, column in old.c.items() if name != "id"),
+            )
+        )
+
+        patched = await self.execute_mappings_fetchone(stmt)
+        if patched is not None:
+            if snapshot:
+                await revisions.add(
+                    draft_id,
+                    revision,
+                    patched["title"],
+                    patched["saved"],
+                    body=patched["body"],
+                )
+            else:
+                slices = [patched[f"slice_{idx}"] for idx in range(len(edits))]
+                as_lists = [[e["start"], e["end"], e["text"]] for e in edits]
+                delta = invert_edits(slices, as_lists)
+                await revisions.add(
+                    draft_id, revision, patched["title"], patched["saved"], delta=delta
+                )
+            return DraftRevisionSchema(
+                revision=patched["revision"], updated=patched["updated"]
+            )
+
+        current = (
+            await self.session.execute(
+                select(self.model.revision)
+                .where(self.model.username == username)
+                .where(self.model.id == draft_id)
+                .where(self.model.is_published == False)  # noqa: E712
+            )
+        ).scalar_one_or_none()
+        if current is None:
+            raise DraftNotFoundError(draft_id=draft_id)
+        if current != revision:
+            raise DraftRevisionConflictError(draft_id, revision)
+        raise InvalidDraftEditError(draft_id)
 
     async def delete(self, draft_id: int, username: str) -> None:
         stmt = (
@@ -96,7 +287,6 @@ class DraftRepo(BaseRepo):
     async def get_by_link(self, username: str, slug: str) -> DraftSchema:
         stmt = (
             self._select_all_columns()
-            .join(UserModel)
             .where(self.model.username == username)
             .where(self.model.draft_hash == slug)
             .where(self.model.is_published == False)  # noqa: E712
@@ -106,11 +296,14 @@ class DraftRepo(BaseRepo):
             return DraftSchema(**draft)
         raise ResourceNotFoundError("Draft is not Found!")
 
-    async def unpublish(self, draft_id):
+    async def _exists(self, draft_id: int, username: str) -> bool:
         stmt = (
-            update(self.model).where(self.model.id == draft_id).values(is_published=False)
+            select(self.model.id)
+            .where(self.model.username == username)
+            .where(self.model.id == draft_id)
+            .where(self.model.is_published == False)  # noqa: E712
         )
-        await self.session.execute(stmt)
+        return (await self.session.execute(stmt)).scalar_one_or_none() is not None
 
     def _select_all_columns(self) -> Select:
         return select(
@@ -121,4 +314,5 @@ class DraftRepo(BaseRepo):
             self.model.updated,
             self.model.username,
             self.model.draft_hash,
+            self.model.revision,
         )
@@ -0,0 +1,153 @@
+from datetime import datetime
+
+from sqlalchemy import select, delete, desc, func
+
+from src.core.config import settings
+from src.core.diffs import apply_edits
+from src.core.exceptions import DraftNotFoundError, DraftRevisionNotFoundError
+from src.core.schemas import LittleDraftRevisionSchema, DraftRevisionBodySchema
+from src.repository import BaseRepo
+from src.repository.models import DraftModel, DraftRevisionModel
+
+
+class DraftRevisionRepo(BaseRepo):
+    """The history of a draft, newest revision first.
+
+    Every SRB_DRAFT_SNAPSHOT_INTERVAL-th revision keeps its whole body, the
+    others only the reverse delta from the next revision, so a revision is
+    rebuilt from the nearest newer snapshot (or the draft itself) walking back.
+    """
+
+    model = DraftRevisionModel
+
+    @staticmethod
+    def is_snapshot(revision: int) -> bool:
+        return revision % settings.SRB_DRAFT_SNAPSHOT_INTERVAL == 0
+
+    async def add(
+        self,
+        draft_id: int,
+        revision: int,
+        title: str,
+        created: datetime,
+        body: str | None = None,
+        delta: list | None = None,
+    ):
+        self.session.add(
+            self.model(
+                draft_id=draft_id,
+                revision=revision,
+                title=title,
+                created=created,
+                body=body,
+                delta=delta,
+            )
+        )
+        await self.session.flush()
+
+    async def get_all(
+        self, draft_id: int, username: str, how_many: int, before: int | None = None
+    ) -> list[LittleDraftRevisionSchema]:
+        stmt = (
+            select(
+                self.model.revision,
+                self.model.title,
+                self.model.created,
+                self.model.body.is_not(None).label("is_snapshot"),
+            )
+            .join(DraftModel, DraftModel.id == self.model.draft_id)
+            .where(DraftModel.username == username)
+            .where(DraftModel.id == draft_id)
+            .where(DraftModel.is_published == False)  # noqa: E712
+            .order_by(desc(self.model.revision))
+            .limit(how_many)
+        )
+        if before is not None:
+            stmt = stmt.where(self.model.revision < before)
+
+        revisions = await self.execute_mappings_fetchall(stmt)
+        if not revisions:
+            await self._get_draft(draft_id, username)
+        return [LittleDraftRevisionSchema(**r) for r in revisions]
+
+    async def get(
+        self, draft_id: int, username: str, revision: int
+    ) -> DraftRevisionBodySchema:
+        draft = await self._get_draft(draft_id, username)
+        if revision == draft["revision"]:
+            return DraftRevisionBodySchema(
+                revision=revision,
+                title=draft["title"],
+                body=draft["body"],
+                created=draft["saved"],
+            )
+        if not 1 <= revision < draft["revision"]:
+            raise DraftRevisionNotFoundError(draft_id, revision)
+
+        snapshot = (
+            select(func.min(self.model.revision))
+            .where(self.model.draft_id == draft_id)
+            .where(self.model.revision >= revision)
+            .where(self.model.body.is_not(None))
+            .scalar_subquery()
+        )
+        # the revisions between `revision` and the nearest newer snapshot
+        stmt = (
+            select(
+                self.model.revision,
+                self.model.title,
+                self.model.body,
+                self.model.delta,
+                self.model.created,
+            )
+            .where(self.model.draft_id == draft_id)
+            .where(self.model.revision >= revision)
+            .where(self.model.revision <= func.coalesce(snapshot, draft["revision"]))
+            .order_by(desc(self.model.revision))
+        )
+        rows = await self.execute_mappings_fetchall(stmt)
+
+        if not rows or rows[0]["body"] is None:
+            # no snapshot on the way, start from the draft itself
+            rows.insert(0, {"revision": draft["revision"], "body": draft["body"]})
+        if len(rows) != rows[0]["revision"] - revision + 1:
+            # a part of the chain was compacted away
+            raise DraftRevisionNotFoundError(draft_id, revision)
+
+        body = rows[0]["body"]
+        for row in rows[1:]:
+            body = apply_edits(body, row["delta"])
+        found = rows[-1]
+        return DraftRevisionBodySchema(
+            revision=revision, title=found["title"], body=body, created=found["created"]
+        )
+
+    async def compact(self, older_than: datetime) -> int:
+        """Drop the deltas saved before `older_than`, return how many.
+
+        Revisions are only rebuilt from newer ones, so dropping the old deltas
+        leaves every younger revision and all the snapshots readable.
+        """
+        stmt = (
+            delete(self.model)
+            .where(self.model.created < older_than)
+            .where(self.model.body.is_(None))
+        )
+        return (await self.session.execute(stmt)).rowcount
+
+    async def _get_draft(self, draft_id: int, username: str) -> dict:
+        stmt = (
+            select(
+                DraftModel.revision,
+                DraftModel.title,
+                DraftModel.body,
+                func.coalesce(DraftModel.updated, DraftModel.created).label("saved"),
+            )
+            .where(DraftModel.username == username)
+            .where(DraftModel.id == draft_id)
+            .where(DraftModel.is_published == False)  # noqa: E712
+        )
+        draft = await self.execute_mappings_fetchone(stmt)
+        if draft is None:
+            raise DraftNotFoundError(draft_id=draft_id)
+        return draft
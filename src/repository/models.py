@@ -1,12 +1,27 @@
 import zoneinfo
 from datetime import datetime
 
-from sqlalchemy import Integer, BigInteger, String, DateTime, ForeignKey, Table, Column
+from sqlalchemy import (
+    Integer,
+    BigInteger,
+    String,
+    DateTime,
+    ForeignKey,
+    Table,
+    Column,
+    Index,
+    Computed,
+    text,
+)
+from sqlalchemy.dialects.postgresql import ARRAY, JSONB, TSVECTOR
 from sqlalchemy.ext.asyncio import AsyncAttrs
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
 from sqlalchemy_utils import LtreeType
 
 
+SEARCH_CONFIG = "english"
+
+
 def utcnow():
     return datetime.now(tz=zoneinfo.ZoneInfo("UTC"))
 
@@ -28,6 +43,8 @@ class UserModel(Base):
     role: Mapped[str]
     created: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=utcnow)
     totp_hash: Mapped[str]
+    # maintained by PostRepo
+    posts_count: Mapped[int] = mapped_column(default=0, server_default="0")
 
     # profile
     name: Mapped[str | None] = mapped_column(String(32))
@@ -64,6 +81,8 @@ class DraftModel(Base):
     draft_hash: Mapped[str]
     is_published: Mapped[bool] = mapped_column(default=lambda: False)
     created: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=utcnow)
+    # bumped on every edit
+    revision: Mapped[int] = mapped_column(default=1, server_default="1")
 
     # FK
     username: Mapped[str] = mapped_column(
@@ -77,15 +96,79 @@ class DraftModel(Base):
         cascade="delete, delete-orphan",
     )
 
+    __table_args__ = (
+        # open-read links
+        Index("ix_drafts_draft_hash", "draft_hash", unique=True),
+        # the drafts of a user, published ones are never looked up here
+        Index(
+            "ix_drafts_username_created_unpublished",
+            "username",
+            "created",
+            "id",
+            postgresql_where=text("is_published = false"),
+        ),
+    )
+
     def __repr__(self):
         return f"<Draft: {self.title!r}>"
 
 
+class DraftRevisionModel(Base):
+    """An earlier state of a draft: a full snapshot every
+    SRB_DRAFT_SNAPSHOT_INTERVAL revisions, otherwise the reverse delta which
+    turns the next revision's body back into this one (see src.core.diffs)
+    """
+
+    __tablename__ = "draft_revisions"
+
+    revision: Mapped[int]
+    title: Mapped[str]
+    body: Mapped[str | None]
+    delta: Mapped[list | None] = mapped_column(JSONB)
+    created: Mapped[datetime] = mapped_column(DateTime(timezone=True))
+
+    # FK
+    draft_id: Mapped[int] = mapped_column(
+        ForeignKey(f"{DraftModel.__tablename__}.id", ondelete="CASCADE"),
+    )
+
+    __table_args__ = (
+        Index("ix_draft_revisions_draft_revision", "draft_id", "revision", unique=True),
+    )
+
+
 class PostModel(Base):
     __tablename__ = "posts"
 
     slug: Mapped[str]
     published: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=utcnow)
+    # top-level comments only, maintained by CommentReplyRepo
+    comments_count: Mapped[int] = mapped_column(default=0, server_default="0")
+    # buffered in Redis, flushed by the views flusher
+    views: Mapped[int] = mapped_column(BigInteger, default=0, server_default="0")
+    readers: Mapped[int] = mapped_column(BigInteger, default=0, server_default="0")
+
+    # read model, copied from the draft and the tags by PostRepo.add
+    title: Mapped[str]
+    body: Mapped[str]
+    # rendered once on publish, see src.core.rendering; NULL until
+    # `python -m src.repair` renders the posts published before it existed
+    body_html: Mapped[str | None]
+    excerpt: Mapped[str]
+    updated: Mapped[datetime | None] = mapped_column(DateTime(timezone=True))
+    tag_list: Mapped[list[str]] = mapped_column(
+        ARRAY(String), default=list, server_default="{}"
+    )
+    # full-text search, title matches rank above body matches
+    search_vector: Mapped[str] = mapped_column(
+        TSVECTOR,
+        Computed(
+            f"setweight(to_tsvector('{SEARCH_CONFIG}', title), 'A') || "
+            f"setweight(to_tsvector('{SEARCH_CONFIG}', body), 'B')",
+            persisted=True,
+        ),
+        deferred=True,
+    )
 
     # FK
     draft_id: Mapped[int] = mapped_column(
@@ -105,6 +188,15 @@ class PostModel(Base):
         cascade="delete, delete-orphan",
     )
 
+    __table_args__ = (
+        Index("ix_posts_username_slug", "username", "slug"),
+        # listings, newest first (a backward scan)
+        Index("ix_posts_username_published", "username", "published", "id"),
+        # the global feed
+        Index("ix_posts_published", "published", "id"),
+        Index("ix_posts_search_vector", "search_vector", postgresql_using="gin"),
+    )
+
     def __repr__(self):
         return f"<Post:{self.slug!r}>"
 
@@ -114,6 +206,8 @@ class TagModel(Base):
 
     tag: Mapped[str] = mapped_column(unique=True)
     created: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=utcnow)
+    # maintained by PostRepo
+    posts_count: Mapped[int] = mapped_column(default=0, server_default="0")
 
     def __repr__(self):
         return f"<TagModel: tag={self.tag!r}>"
@@ -124,6 +218,8 @@ association_table = Table(
     Base.metadata,
     Column("post_id", ForeignKey(f"{PostModel.__tablename__}.id"), primary_key=True),
     Column("tag_id", ForeignKey(f"{TagModel.__tablename__}.id"), primary_key=True),
+    # the primary key only serves post -> tags
+    Index("ix_association_table_tag_post", "tag_id", "post_id"),
 )
 
 
@@ -134,6 +230,7 @@ class CommentModel(Base):
     path: Mapped[str | None] = mapped_column(LtreeType)
     commented: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=utcnow)
     updated: Mapped[datetime | None] = mapped_column(DateTime(timezone=True))
+    reply_count: Mapped[int] = mapped_column(default=0, server_default="0")
 
     # FK
     post_id: Mapped[int] = mapped_column(
@@ -150,3 +247,19 @@ class CommentModel(Base):
     children: Mapped[list["CommentModel"]] = relationship(
         cascade="delete, delete-orphan",
     )
+
+    __table_args__ = (
+        Index("ix_comments_path", "path", postgresql_using="gist"),
+        # `first` and `last` orders (the latter is a backward scan)
+        Index(
+            "ix_comments_post_parent_commented", "post_id", "parent_id", "commented", "id"
+        ),
+        # `most_replied` order
+        Index(
+            "ix_comments_post_parent_reply_count",
+            "post_id",
+            "parent_id",
+            "reply_count",
+            "id",
+        ),
+    )
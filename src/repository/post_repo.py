@@ -1,23 +1,54 @@
-from sqlalchemy import select, func
+from datetime import datetime
+
+from sqlalchemy import (
+    delete,
+    select,
+    func,
+    update,
+    desc,
+    tuple_,
+    Select,
+    REAL,
+    BigInteger,
+    String,
+    values,
+    column,
+    literal,
+)
 
 from src.core.exceptions import (
     DraftNotFoundError,
     DraftPublishedBeforeError,
     PostNotFoundError,
 )
-from src.core.schemas import PostSchema, LittlePostSchema
+from src.core.rendering import render_markdown
+from src.core.schemas import (
+    PostSchema,
+    LittlePostSchema,
+    SearchResultSchema,
+    BodyFormat,
+)
+from src.core.utils import make_excerpt
 from src.repository import BaseRepo
-from src.repository.draft_repo import DraftRepo
 from src.repository.models import (
+    SEARCH_CONFIG,
     DraftModel,
     PostModel,
+    CommentModel,
+    UserModel,
     TagModel,
     association_table,
-    CommentModel,
 )
 from src.repository.tag_repo import TagRepo
 
 
+def _escape_html(column):
+    """Escape the text before ts_headline wraps the matches in <mark> tags"""
+    for char, entity in (("&", "&amp;"), ("<", "&lt;"), (">", "&gt;")):
+        column = func.replace(column, char, entity)
+    return column
+
+
 class PostRepo(BaseRepo):
     model = PostModel
 
@@ -36,81 +67,276 @@ class PostRepo(BaseRepo):
         tags = await TagRepo(self.session).get_or_create(_ts)
 
         data["slug"] = f"{data['slug']}-{draft.draft_hash}"
-        post_model = self.model(**data)
+        post_model = self.model(
+            **data,
+            title=draft.title,
+            body=draft.body,
+            body_html=render_markdown(draft.body),
+            excerpt=make_excerpt(draft.body),
+            updated=draft.updated,
+            tag_list=sorted(_ts),
+        )
         for tag in tags:
             post_model.tags.add(tag)
 
         draft.is_published = True
         self.session.add_all([post_model, draft])
+        await self.session.flush()
+        await self._bump_posts_count(data["username"], 1)
+        await TagRepo(self.session).bump_posts_count(post_model.id, 1)
 
         return post_model.slug
 
-    async def get_by_link(self, username: str, link: str) -> PostSchema:
-        post_itself_subquery = (
+    async def get_by_link(
+        self, username: str, link: str, body_format: BodyFormat = "markdown"
+    ) -> PostSchema:
+        body = self.model.body_html if body_format == "html" else self.model.body
+        stmt = (
             select(
-                DraftModel.title,
-                DraftModel.body,
-                DraftModel.updated,
-                self.model.published,
                 self.model.id,
+                self.model.title,
+                body.label("body"),
+                self.model.body.label("source"),
+                literal(body_format).label("body_format"),
+                self.model.tag_list.label("tags"),
+                self.model.published,
+                self.model.updated,
+                self.model.comments_count,
+                self.model.views,
+                self.model.readers,
             )
-            .join(self.model.draft)
-            .join(self.model.user)
             .where(self.model.username == username)
             .where(self.model.slug == link)
-        ).subquery("post_itself")
-
-        post_with_tags = (
-            select(post_itself_subquery, func.array_agg(TagModel.tag).label("tags"))
-            .outerjoin(
-                association_table.join(TagModel),
-                post_itself_subquery.columns.id  # noqa
-                == association_table.columns.post_id,
-            )
-            .group_by(post_itself_subquery)
-        ).subquery("post_with_tags")
-
-        comments_count = (
-            (
-                select(func.count("*"))
-                .select_from(CommentModel)
-                .where(CommentModel.post_id == post_with_tags.columns.id)
-                .where(CommentModel.parent_id == None)  # noqa: E711
-            )
-            .scalar_subquery()
-            .label("comments_count")
         )
 
-        post_tags_comments_count = select(post_with_tags, comments_count)
-        raw_post = await self.execute_mappings_fetchone(post_tags_comments_count)
+        raw_post = await self.execute_mappings_fetchone(stmt)
         if raw_post is None:
             raise PostNotFoundError(link)
+        source = raw_post.pop("source")
+        if raw_post["body"] is None:
+            # not rendered yet, see render_bodies
+            raw_post["body"] = render_markdown(source)
         return PostSchema(**raw_post)
 
-    async def get_all(self, username: str) -> list[LittlePostSchema]:
+    async def render_bodies(self, everything: bool = False, batch_size: int = 500) -> int:
+        """Render body_html of the posts which have none (or of all of them,
+        after a change of the renderer), return how many
+        """
+        rendered, last_id = 0, 0
+        while True:
+            stmt = (
+                select(self.model.id, self.model.body)
+                .where(self.model.id > last_id)
+                .order_by(self.model.id)
+                .limit(batch_size)
+            )
+            if not everything:
+                stmt = stmt.where(self.model.body_html == None)  # noqa: E711
+            rows = (await self.session.execute(stmt)).all()
+            if not rows:
+                return rendered
+
+            batch = values(
+                column("id", BigInteger), column("body_html", String), name="batch"
+            ).data([(id_, render_markdown(body)) for id_, body in rows])
+            await self.session.execute(
+                update(self.model)
+                .where(self.model.id == batch.c.id)
+                .values(body_html=batch.c.body_html)
+                .execution_options(synchronize_session=False)
+            )
+            rendered += len(rows)
+            last_id = rows[-1].id
+
+    async def recount_comments(self) -> int:
+        """Repair comments_count of the posts which drifted, return how many"""
+        actual = (
+            select(func.count())
+            .select_from(CommentModel)
+            .where(CommentModel.post_id == self.model.id)
+            .where(CommentModel.parent_id == None)  # noqa: E711
+            .scalar_subquery()
+        )
+        stmt = (
+            update(self.model)
+            .where(self.model.comments_count != actual)
+            .values(comments_count=actual)
+        )
+        return (await self.session.execute(stmt)).rowcount
+
+    async def get_all(
+        self,
+        username: str,
+        how_many: int,
+        after: tuple[datetime, int] | None = None,
+    ) -> list[LittlePostSchema]:
+        stmt = self._listing_stmt(how_many, after).where(self.model.username == username)
+        posts = await self.execute_mappings_fetchall(stmt)
+        return [LittlePostSchema(**p) for p in posts]
+
+    async def get_feed(
+        self, how_many: int, after: tuple[datetime, int] | None = None
+    ) -> list[LittlePostSchema]:
+        posts = await self.execute_mappings_fetchall(self._listing_stmt(how_many, after))
+        return [LittlePostSchema(**p) for p in posts]
+
+    def _listing_stmt(self, how_many: int, after: tuple[datetime, int] | None) -> Select:
+        # newest first, served by ix_posts_published or, with a username
+        # filter, by ix_posts_username_published (backward scans)
+        sort_key = (self.model.published, self.model.id)
         stmt = (
             select(
                 self.model.id,
-                DraftModel.title,
+                self.model.title,
                 self.model.slug,
+                self.model.username,
                 self.model.published,
+                self.model.excerpt,
+                self.model.tag_list.label("tags"),
             )
-            .join(self.model.draft)
-            .join(self.model.user)
-            .where(self.model.username == username)
+            .order_by(*map(desc, sort_key))
+            .limit(how_many)
+        )
+        if after is not None:
+            last_seen = tuple_(*after, types=[key.type for key in sort_key])
+            stmt = stmt.where(tuple_(*sort_key) < last_seen)
+        return stmt
+
+    async def search(
+        self,
+        query: str,
+        how_many: int,
+        after: tuple[float, int] | None = None,
+    ) -> list[SearchResultSchema]:
+        ts_query = func.websearch_to_tsquery(SEARCH_CONFIG, query)
+        rank = func.ts_rank(self.model.search_vector, ts_query, type_=REAL)
+
+        # rank every match through ix_posts_search_vector, but build the
+        # (costly) snippets of the returned page only
+        ranked = (
+            select(self.model.id, rank.label("rank"))
+            .where(self.model.search_vector.bool_op("@@")(ts_query))
+            .subquery("ranked")
         )
+        sort_key = (ranked.c.rank, ranked.c.id)
+        page = select(ranked).order_by(*map(desc, sort_key)).limit(how_many)
+        if after is not None:
+            last_seen = tuple_(*after, types=[REAL, ranked.c.id.type])
+            page = page.where(tuple_(*sort_key) < last_seen)
+        page = page.subquery("page")
 
+        snippet = func.ts_headline(
+            SEARCH_CONFIG,
+            _escape_html(self.model.body),
+            ts_query,
+            "StartSel=<mark>, StopSel=</mark>, MaxFragments=2, MaxWords=30, MinWords=10",
+        )
+        stmt = (
+            select(
+                self.model.id,
+                self.model.title,
+                self.model.slug,
+                self.model.username,
+                self.model.published,
+                self.model.excerpt,
+                self.model.tag_list.label("tags"),
+                snippet.label("snippet"),
+                page.c.rank,
+            )
+            .join(page, page.c.id == self.model.id)
+            .order_by(desc(page.c.rank), desc(page.c.id))
+        )
         posts = await self.execute_mappings_fetchall(stmt)
-        return [LittlePostSchema(**p) for p in posts]
+        return [SearchResultSchema(**p) for p in posts]
+
+    async def add_views(self, batch: list[tuple[int, int, int]]):
+        """Apply (post_id, new views, unique readers) rows in a single UPDATE"""
+        rows = values(
+            column("id", BigInteger),
+            column("views", BigInteger),
+            column("readers", BigInteger),
+            name="batch",
+        ).data(sorted(batch))  # a stable lock order between the flushers
+        stmt = (
+            update(self.model)
+            .where(self.model.id == rows.c.id)
+            .values(
+                views=self.model.views + rows.c.views,
+                readers=func.greatest(self.model.readers, rows.c.readers),
+            )
+            .execution_options(synchronize_session=False)
+        )
+        await self.session.execute(stmt)
+
+    async def count(self, username: str) -> int:
+        stmt = select(UserModel.posts_count).where(UserModel.username == username)
+        return (await self.session.execute(stmt)).scalar_one_or_none() or 0
+
+    async def recount_posts(self) -> int:
+        """Repair posts_count of the users which drifted, return how many"""
+        actual = (
+            select(func.count())
+            .select_from(self.model)
+            .where(self.model.username == UserModel.username)
+            .scalar_subquery()
+        )
+        stmt = (
+            update(UserModel)
+            .where(UserModel.posts_count != actual)
+            .values(posts_count=actual)
+        )
+        return (await self.session.execute(stmt)).rowcount
+
+    async def _bump_posts_count(self, username: str, by: int):
+        stmt = (
+            update(UserModel)
+            .where(UserModel.username == username)
+            .values(posts_count=UserModel.posts_count + by)
+        )
+        await self.session.execute(stmt)
 
     async def unpublish(self, post_id: int) -> int:
-        draft_repo = DraftRepo(self.session)
+        """Remove the post with its comments and tag links in one statement,
+        mark its draft as unpublished and return the draft id
+        """
+        links = association_table.c
+        removed_comments = (
+            delete(CommentModel)
+            .where(CommentModel.post_id == post_id)
+            .cte("removed_comments")
+        )
+        bump_tags = (
+            update(TagModel)
+            .where(TagModel.id.in_(select(links.tag_id).where(links.post_id == post_id)))
+            .values(posts_count=TagModel.posts_count - 1)
+            .cte("bump_tags")
+        )
+        removed_links = (
+            delete(association_table).where(links.post_id == post_id).cte("removed_links")
+        )
+        removed_post = (
+            delete(self.model)
+            .where(self.model.id == post_id)
+            .returning(self.model.draft_id, self.model.username)
+            .cte("removed_post")
+        )
+        bump_user = (
+            update(UserModel)
+            .where(
+                UserModel.username == select(removed_post.c.username).scalar_subquery()
+            )
+            .values(posts_count=UserModel.posts_count - 1)
+            .cte("bump_user")
+        )
+        stmt = (
+            update(DraftModel)
+            .where(DraftModel.id == removed_post.c.draft_id)
+            .values(is_published=False)
+            .returning(DraftModel.id)
+            .add_cte(removed_comments, bump_tags, removed_links, removed_post, bump_user)
+        )
 
-        post = (
-            await self.session.execute(select(self.model).where(self.model.id == post_id))
-        ).scalar_one_or_none()
-        if post is None:
+        draft_id = (await self.session.execute(stmt)).scalar_one_or_none()
+        if draft_id is None:
             raise PostNotFoundError(post_id)
-        await self.session.delete(post)
-        await draft_repo.unpublish(post.draft_id)
-        return post.draft_id
+        return draft_id
@@ -1,21 +1,92 @@
-from sqlalchemy import select
+from sqlalchemy import select, update, desc, func, any_, bindparam, String
+from sqlalchemy.dialects.postgresql import ARRAY, insert
 
+from src.core.exceptions import TagNotFoundError
+from src.core.schemas import LittlePostSchema
 from src.repository import BaseRepo
-from src.repository.models import TagModel
+from src.repository.models import TagModel, PostModel, association_table
 
 
 class TagRepo(BaseRepo):
     model = TagModel
 
     async def get_or_create(self, tags) -> list[TagModel]:
-        tag_model_objects: list[TagModel] = []
-        for tag in tags:
-            stmt = select(self.model).where(self.model.tag == tag)
-            tag_obj = (await self.session.execute(stmt)).scalar_one_or_none()
-            if tag_obj is not None:
-                tag_model_objects.append(tag_obj)
-            else:
-                t = self.model(tag=tag)
-                tag_model_objects.append(t)
-        self.session.add_all(tag_model_objects)
-        return tag_model_objects
+        # sorted, so concurrent publishes take the row locks in the same order
+        tags = sorted(tags)
+        upsert = (
+            insert(self.model)
+            .values([{"tag": tag} for tag in tags])
+            .on_conflict_do_nothing(index_elements=[self.model.tag])
+        )
+        await self.session.execute(upsert)
+
+        stmt = select(self.model).where(
+            self.model.tag == any_(bindparam("tags", tags, type_=ARRAY(String)))
+        )
+        return list((await self.session.execute(stmt)).scalars().all())
+
+    async def get_posts(
+        self, tag: str, how_many: int, after: int | None = None
+    ) -> list[LittlePostSchema]:
+        # newest first by post id, a backward scan of ix_association_table_tag_post
+        # which stops after `how_many` rows however large the tag is
+        a = association_table.c
+        stmt = (
+            select(
+                PostModel.id,
+                PostModel.title,
+                PostModel.slug,
+                PostModel.username,
+                PostModel.published,
+                PostModel.excerpt,
+                PostModel.tag_list.label("tags"),
+            )
+            .select_from(association_table)
+            .join(self.model, self.model.id == a.tag_id)
+            .join(PostModel, PostModel.id == a.post_id)
+            .where(self.model.tag == tag)
+            .order_by(desc(a.post_id))
+            .limit(how_many)
+        )
+        if after is not None:
+            stmt = stmt.where(a.post_id < after)
+
+        posts = await self.execute_mappings_fetchall(stmt)
+        if not posts:
+            await self.count(tag)
+        return [LittlePostSchema(**p) for p in posts]
+
+    async def count(self, tag: str) -> int:
+        stmt = select(self.model.posts_count).where(self.model.tag == tag)
+        posts_count = (await self.session.execute(stmt)).scalar_one_or_none()
+        if posts_count is None:
+            raise TagNotFoundError(tag)
+        return posts_count
+
+    async def bump_posts_count(self, post_id: int, by: int):
+        """Add `by` to posts_count of the tags of the post"""
+        tag_ids = select(association_table.c.tag_id).where(
+            association_table.c.post_id == post_id
+        )
+        stmt = (
+            update(self.model)
+            .where(self.model.id.in_(tag_ids))
+            .values(posts_count=self.model.posts_count + by)
+            .execution_options(synchronize_session=False)
+        )
+        await self.session.execute(stmt)
+
+    async def recount_posts(self) -> int:
+        """Repair posts_count of the tags which drifted, return how many"""
+        actual = (
+            select(func.count())
+            .select_from(association_table)
+            .where(association_table.c.tag_id == self.model.id)
+            .scalar_subquery()
+        )
+        stmt = (
+            update(self.model)
+            .where(self.model.posts_count != actual)
+            .values(posts_count=actual)
+        )
+        return (await self.session.execute(stmt)).rowcount
@@ -1,4 +1,17 @@
-from sqlalchemy.ext.asyncio import async_sessionmaker
+from collections.abc import Awaitable, Callable
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+_AFTER_COMMIT = "after_commit"
+
+
+def after_commit(session: AsyncSession, callback: Callable[..., Awaitable], *args):
+    """Run `callback(*args)` once the UnitOfWork of `session` has committed.
+
+    Cache invalidations and events go here: sent before the commit, a reader
+    could still see (and cache) the old rows after them.
+    """
+    session.info.setdefault(_AFTER_COMMIT, []).append((callback, args))
 
 
 class UnitOfWork:
@@ -13,4 +26,8 @@ class UnitOfWork:
         if exc_type is not None:
             await self.session.rollback()
         await self.session.commit()
+        callbacks = self.session.info.pop(_AFTER_COMMIT, [])
         await self.session.close()
+        if exc_type is None:
+            for callback, args in callbacks:
+                await callback(*args)
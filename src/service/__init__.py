@@ -1,6 +1,8 @@
+from collections.abc import Awaitable, Callable
 from typing import TypeVar, Generic
 
 from src.core.redis_db import RedisClient
+from src.repository.unitofwork import after_commit
 
 R = TypeVar("R")
 
@@ -9,3 +11,7 @@ class Service(Generic[R]):
     def __init__(self, repo: R | None, redis_client: RedisClient | None = None):
         self.repo: R = repo
         self.redis_client = redis_client
+
+    def after_commit(self, callback: Callable[..., Awaitable], *args):
+        """Run `callback(*args)` once the transaction of the repo commits"""
+        after_commit(self.repo.session, callback, *args)
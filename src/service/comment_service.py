@@ -2,11 +2,44 @@ from datetime import datetime
 from typing import Literal
 from zoneinfo import ZoneInfo
 
-from src.core.schemas import CreateCommentReplySchema, CommentReplySchema
+from src.core.cache import invalidate_post_page
+from src.core.config import settings
+from src.core.events import comment_events_channel, comment_event
+from src.core.exceptions import InvalidCursorError
+from src.core.schemas import (
+    CreateCommentReplySchema,
+    CommentReplySchema,
+    CommentTreeSchema,
+)
+from src.core.utils import encode_cursor, decode_cursor
 from src.repository.comment_repo import CommentReplyRepo
 from src.service import Service
 
 
+def _generation_key(post_id: int) -> str:
+    return f"comments:{post_id}:generation"
+
+
+def _encode_comment_cursor(comment: CommentReplySchema, order: str) -> str:
+    if order == "most_replied":
+        return encode_cursor(order, comment.reply_count, comment.id)
+    return encode_cursor(order, comment.commented.isoformat(), comment.id)
+
+
+def _decode_comment_cursor(cursor: str, order: str) -> tuple[datetime | int, int]:
+    try:
+        cursor_order, key, id_ = decode_cursor(cursor)
+        if cursor_order != order or type(id_) is not int:  # noqa E721
+            raise ValueError
+        if order == "most_replied":
+            if type(key) is not int:  # noqa E721
+                raise ValueError
+            return key, id_
+        return datetime.fromisoformat(key), id_
+    except (ValueError, TypeError):
+        raise InvalidCursorError(cursor) from None
+
+
 class CommentReplyService(Service[CommentReplyRepo]):
     async def create_comment(
         self, post_id: int, comment: CreateCommentReplySchema, username: str
@@ -15,7 +48,12 @@ class CommentReplyService(Service[CommentReplyRepo]):
         data["post_id"] = post_id
         data["username"] = username
         data["parent_id"] = None
-        return await self.repo.add(data)
+        created = await self.repo.add(data)
+        self.after_commit(self._invalidate_pages, post_id)
+        # comments_count of the post changed
+        self.after_commit(invalidate_post_page, self.redis_client, post_id)
+        self.after_commit(self._publish, post_id, comment_event("created", created.id))
+        return created
 
     async def create_reply(
         self,
@@ -28,7 +66,12 @@ class CommentReplyService(Service[CommentReplyRepo]):
         data["post_id"] = post_id
         data["username"] = username
         data["parent_id"] = comment_id
-        return await self.repo.add(data)
+        created = await self.repo.add(data)
+        self.after_commit(self._invalidate_pages, post_id)
+        self.after_commit(
+            self._publish, post_id, comment_event("created", created.id, comment_id)
+        )
+        return created
 
     async def get_comments(
         self,
@@ -36,8 +79,9 @@ class CommentReplyService(Service[CommentReplyRepo]):
         page: int,
         how_many: int,
         order: Literal["first", "last", "most_replied"],
-    ) -> list[CommentReplySchema]:
-        return await self.repo.get(post_id, page, how_many, order)
+        cursor: str | None = None,
+    ) -> tuple[list[CommentReplySchema], str | None]:
+        return await self._get_page(post_id, None, page, how_many, order, cursor)
 
     async def get_replies(
         self,
@@ -46,8 +90,14 @@ class CommentReplyService(Service[CommentReplyRepo]):
         page: int,
         how_many: int,
         order: Literal["first", "last", "most_replied"],
-    ) -> list[CommentReplySchema]:
-        return await self.repo.get(post_id, page, how_many, order, parent_id=comment_id)
+        cursor: str | None = None,
+    ) -> tuple[list[CommentReplySchema], str | None]:
+        return await self._get_page(post_id, comment_id, page, how_many, order, cursor)
+
+    async def get_thread(
+        self, post_id: int, comment_id: int | None, depth: int | None
+    ) -> list[CommentTreeSchema]:
+        return await self.repo.get_tree(post_id, comment_id, depth)
 
     async def update_comment(
         self,
@@ -59,7 +109,77 @@ class CommentReplyService(Service[CommentReplyRepo]):
         data = comment.model_dump()
         data["updated"] = datetime.now(tz=ZoneInfo("UTC"))
         data["username"] = username
-        return await self.repo.update(data, comment_id, post_id)
+        updated = await self.repo.update(data, comment_id, post_id)
+        self.after_commit(self._invalidate_pages, post_id)
+        self.after_commit(
+            self._publish,
+            post_id,
+            comment_event("updated", comment_id, updated.parent_id),
+        )
+        return updated
+
+    async def delete_comment(self, post_id: int, comment_id: int) -> int:
+        removed_count = await self.repo.delete(post_id, comment_id)
+        self.after_commit(self._invalidate_pages, post_id)
+        self.after_commit(invalidate_post_page, self.redis_client, post_id)
+        self.after_commit(self._publish, post_id, comment_event("deleted", comment_id))
+        return removed_count
+
+    async def _invalidate_pages(self, post_id: int):
+        """Move the post to a new generation so none of its cached pages
+        can be reached anymore; the old entries just expire.
+        """
+        if self.redis_client is not None:
+            await self.redis_client.incr(_generation_key(post_id))
+
+    async def _publish(self, post_id: int, event: str):
+        if self.redis_client is not None:
+            await self.redis_client.publish(comment_events_channel(post_id), event)
+
+    async def _get_page(
+        self,
+        post_id: int,
+        parent_id: int | None,
+        page: int,
+        how_many: int,
+        order: Literal["first", "last", "most_replied"],
+        cursor: str | None,
+    ) -> tuple[list[CommentReplySchema], str | None]:
+        if self.redis_client is None:
+            return await self._fetch_page(
+                post_id, parent_id, page, how_many, order, cursor
+            )
+
+        generation = await self.redis_client.get(_generation_key(post_id), 0)
+        position = f"page={page}" if cursor is None else f"cursor={cursor}"
+        key = f"comments:{post_id}:{generation}:{parent_id}:{order}:{position}:{how_many}"
+        cached = await self.redis_client.get(key)
+        if cached is not None:
+            return cached
+
+        comments_page = await self._fetch_page(
+            post_id, parent_id, page, how_many, order, cursor
+        )
+        await self.redis_client.set(
+            key, comments_page, timeout=settings.SRB_COMMENTS_CACHE_EXPIRE_SECONDS
+        )
+        return comments_page
+
+    async def _fetch_page(
+        self,
+        post_id: int,
+        parent_id: int | None,
+        page: int,
+        how_many: int,
+        order: Literal["first", "last", "most_replied"],
+        cursor: str | None,
+    ) -> tuple[list[CommentReplySchema], str | None]:
+        after = None if cursor is None else _decode_comment_cursor(cursor, order)
+        comments = await self.repo.get(
+            post_id, page, how_many, order, parent_id=parent_id, after=after
+        )
 
-    async def delete_comment(self, post_id: int, comment_id: int):
-        await self.repo.delete(post_id, comment_id)
+        next_cursor = None
+        if len(comments) == how_many:
+            next_cursor = _encode_comment_cursor(comments[-1], order)
+        return comments, next_cursor
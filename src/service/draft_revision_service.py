@@ -0,0 +1,28 @@
+from src.core.exceptions import InvalidCursorError
+from src.core.schemas import LittleDraftRevisionSchema, DraftRevisionBodySchema
+from src.core.utils import encode_cursor, decode_cursor
+from src.repository.draft_revision_repo import DraftRevisionRepo
+from src.service import Service
+
+
+class DraftRevisionService(Service[DraftRevisionRepo]):
+    async def get_all(
+        self, draft_id: int, username: str, how_many: int, cursor: str | None = None
+    ) -> tuple[list[LittleDraftRevisionSchema], str | None]:
+        before = None
+        if cursor is not None:
+            values = decode_cursor(cursor)
+            if len(values) != 1 or type(values[0]) is not int:  # noqa E721
+                raise InvalidCursorError(cursor)
+            (before,) = values
+
+        revisions = await self.repo.get_all(draft_id, username, how_many, before)
+        next_cursor = None
+        if len(revisions) == how_many:
+            next_cursor = encode_cursor(revisions[-1].revision)
+        return revisions, next_cursor
+
+    async def get_one(
+        self, draft_id: int, username: str, revision: int
+    ) -> DraftRevisionBodySchema:
+        return await self.repo.get(draft_id, username, revision)
@@ -1,55 +1,131 @@
-import hashlib
+import secrets
 from datetime import datetime
 
+from src.core.cache import (
+    cache_open_read_draft,
+    if_match_revisions,
+    invalidate_open_read_draft,
+    open_read_draft_key,
+)
 from src.core.config import settings
 from src.core.enums import APIPrefixesEnum, APIMethodsEnum
+from src.core.exceptions import InvalidCursorError, DraftPreconditionFailedError
 from src.core.schemas import (
     DraftSchema,
     CreateDraftSchema,
     LittleDraftSchema,
     UpdateDraftSchema,
+    PatchDraftSchema,
+    DraftRevisionSchema,
 )
+from src.core.utils import encode_cursor, decode_cursor
 from src.repository.draft_repo import DraftRepo
 from src.service import Service
 
 
-def draft_hash(username) -> str:
-    to_hash = f"{datetime.now().isoformat()}-{username}".encode()
-    return hashlib.sha256(to_hash).hexdigest()[:16]
+def _decode_draft_cursor(cursor: str) -> tuple[datetime, int]:
+    try:
+        created, id_ = decode_cursor(cursor)
+        if type(id_) is not int:  # noqa E721
+            raise ValueError
+        return datetime.fromisoformat(created), id_
+    except (ValueError, TypeError):
+        raise InvalidCursorError(cursor) from None
+
+
+def draft_hash() -> str:
+    # 64 random bits, a collision is only retried, never a guessable link
+    return secrets.token_hex(8)
 
 
 class DraftService(Service[DraftRepo]):
     async def create_draft(self, username: str, draft: CreateDraftSchema) -> DraftSchema:
         raw_draft = draft.model_dump()
         raw_draft["username"] = username
-        raw_draft["draft_hash"] = draft_hash(username)
-        draft = await self.repo.add(raw_draft)
-        draft.draft_hash = (
+        created = None
+        while created is None:
+            raw_draft["draft_hash"] = draft_hash()
+            created = await self.repo.add(raw_draft)
+        created.draft_hash = (
             f"{settings.PREFIX}/{APIPrefixesEnum.DRAFTS.value}/open-read/@{username}/"
             + "{}"
-        ).format(draft.draft_hash)
-        return draft
+        ).format(created.draft_hash)
+        return created
 
     async def get_one(self, draft_id: int, username: str) -> DraftSchema:
         return await self.repo.get(draft_id, username)
 
-    async def get_all(self, username: str, desc_order: bool) -> list[LittleDraftSchema]:
-        drafts = await self.repo.get_all(username, desc_order)
+    async def get_all(
+        self,
+        username: str,
+        desc_order: bool,
+        how_many: int,
+        cursor: str | None = None,
+    ) -> tuple[list[LittleDraftSchema], str | None]:
+        after = None if cursor is None else _decode_draft_cursor(cursor)
+        drafts = await self.repo.get_all(username, desc_order, how_many, after)
         get_url = f"{settings.PREFIX}/{APIPrefixesEnum.DRAFTS.value}/" + "{}"
         for draft in drafts:
             draft.link = (APIMethodsEnum.GET, get_url.format(draft.id))
-        return drafts
+
+        next_cursor = None
+        if len(drafts) == how_many:
+            last = drafts[-1]
+            next_cursor = encode_cursor(last.created.isoformat(), last.id)
+        return drafts, next_cursor
 
     async def update_draft(
         self,
         draft_id: int,
         draft: UpdateDraftSchema,
         username: str,
+        if_match: str | None = None,
     ) -> DraftSchema:
-        return await self.repo.update(draft_id, draft.model_dump(), username)
+        revisions = if_match_revisions(draft_id, if_match)
+        updated = await self.repo.update(
+            draft_id, draft.model_dump(), username, revisions
+        )
+        self.after_commit(invalidate_open_read_draft, self.redis_client, draft_id)
+        return updated
+
+    async def patch_draft(
+        self,
+        draft_id: int,
+        patch: PatchDraftSchema,
+        username: str,
+        if_match: str | None = None,
+    ) -> DraftRevisionSchema:
+        # the edits are relative to `patch.revision`, which the update checks
+        revisions = if_match_revisions(draft_id, if_match)
+        if revisions is not None and patch.revision not in revisions:
+            raise DraftPreconditionFailedError(draft_id)
+
+        edits = [edit.model_dump() for edit in patch.edits]
+        revision = await self.repo.patch(
+            draft_id, username, patch.revision, edits, patch.title
+        )
+        self.after_commit(invalidate_open_read_draft, self.redis_client, draft_id)
+        return revision
 
     async def delete_draft(self, draft_id: int, username: str) -> None:
         await self.repo.delete(draft_id, username)
+        self.after_commit(invalidate_open_read_draft, self.redis_client, draft_id)
+
+    async def get_global_page(self, username: str, slug: str) -> bytes:
+        """Return the serialized draft, from the cache when possible"""
+        if self.redis_client is not None:
+            cached = await self.redis_client.get(open_read_draft_key(username, slug))
+            if cached is not None:
+                return cached[1]
 
-    async def get_global(self, username: str, slug: str) -> DraftSchema:
-        return await self.repo.get_by_link(username, slug)
+        draft = await self.repo.get_by_link(username, slug)
+        body = draft.model_dump_json().encode()
+        if self.redis_client is not None:
+            await cache_open_read_draft(
+                self.redis_client,
+                username,
+                slug,
+                (draft.id, body),
+                timeout=settings.SRB_DRAFT_CACHE_EXPIRE_SECONDS,
+            )
+        return body
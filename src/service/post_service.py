@@ -1,10 +1,55 @@
+from datetime import datetime
+
+from src.core.cache import (
+    invalidate_open_read_draft,
+    cache_post_page,
+    feed_head_key,
+    invalidate_feed,
+    invalidate_post_page,
+    make_etag,
+    post_page_key,
+)
 from src.core.config import settings
 from src.core.enums import APIPrefixesEnum
-from src.core.schemas import PublishDraftSchema, PostSchema, LittlePostSchema
+from src.core.exceptions import InvalidCursorError
+from src.core.schemas import (
+    PublishDraftSchema,
+    LittlePostSchema,
+    SearchResultSchema,
+    BodyFormat,
+)
+from src.core.utils import encode_cursor, decode_cursor
 from src.repository.post_repo import PostRepo
 from src.service import Service
 
 
+def _decode_post_cursor(cursor: str) -> tuple[datetime, int]:
+    try:
+        published, id_ = decode_cursor(cursor)
+        if type(id_) is not int:  # noqa E721
+            raise ValueError
+        return datetime.fromisoformat(published), id_
+    except (ValueError, TypeError):
+        raise InvalidCursorError(cursor) from None
+
+
+def _decode_search_cursor(cursor: str) -> tuple[float, int]:
+    try:
+        rank, id_ = decode_cursor(cursor)
+        if type(id_) is not int or type(rank) not in (int, float):  # noqa E721
+            raise ValueError
+        return float(rank), id_
+    except (ValueError, TypeError):
+        raise InvalidCursorError(cursor) from None
+
+
+def _next_post_cursor(posts: list[LittlePostSchema], how_many: int) -> str | None:
+    if len(posts) < how_many:
+        return None
+    last = posts[-1]
+    return encode_cursor(last.published.isoformat(), last.id)
+
+
 class PostService(Service[PostRepo]):
     async def create_post(
         self,
@@ -16,15 +61,84 @@ class PostService(Service[PostRepo]):
         data["draft_id"] = draft_id
         data["username"] = username
         link = await self.repo.add(data)
+        self.after_commit(invalidate_open_read_draft, self.redis_client, draft_id)
+        self.after_commit(invalidate_feed, self.redis_client)
         return link
 
-    async def get_global_post(self, username: str, link: str) -> PostSchema:
-        return await self.repo.get_by_link(username, link)
+    async def get_global_post_page(
+        self, username: str, link: str, body_format: BodyFormat = "markdown"
+    ) -> tuple[int, bytes, str]:
+        """Return the post id, the serialized post and its ETag, from the cache
+        when possible
+        """
+        if self.redis_client is not None:
+            cached = await self.redis_client.get(
+                post_page_key(username, link, body_format)
+            )
+            if cached is not None:
+                return cached
+
+        post = await self.repo.get_by_link(username, link, body_format)
+        body = post.model_dump_json().encode()
+        page = post.id, body, make_etag(body)
+        if self.redis_client is not None:
+            await cache_post_page(
+                self.redis_client,
+                username,
+                link,
+                body_format,
+                page,
+                timeout=settings.SRB_POST_CACHE_EXPIRE_SECONDS,
+            )
+        return page
+
+    async def get_all_posts(
+        self, username: str, how_many: int, cursor: str | None = None
+    ) -> tuple[list[LittlePostSchema], str | None]:
+        after = None if cursor is None else _decode_post_cursor(cursor)
+        posts = await self.repo.get_all(username, how_many, after)
+        return posts, _next_post_cursor(posts, how_many)
+
+    async def get_feed(
+        self, how_many: int, cursor: str | None = None
+    ) -> tuple[list[LittlePostSchema], str | None]:
+        if cursor is not None:
+            posts = await self.repo.get_feed(how_many, _decode_post_cursor(cursor))
+            return posts, _next_post_cursor(posts, how_many)
+
+        # the head page is what almost every visitor asks for
+        key = None
+        if self.redis_client is not None:
+            key = await feed_head_key(self.redis_client, how_many)
+            cached = await self.redis_client.get(key)
+            if cached is not None:
+                return cached
+
+        posts = await self.repo.get_feed(how_many)
+        head = posts, _next_post_cursor(posts, how_many)
+        if key is not None:
+            await self.redis_client.set(
+                key, head, timeout=settings.SRB_FEED_CACHE_EXPIRE_SECONDS
+            )
+        return head
+
+    async def search(
+        self, query: str, how_many: int, cursor: str | None = None
+    ) -> tuple[list[SearchResultSchema], str | None]:
+        after = None if cursor is None else _decode_search_cursor(cursor)
+        posts = await self.repo.search(query, how_many, after)
+
+        next_cursor = None
+        if len(posts) == how_many:
+            next_cursor = encode_cursor(posts[-1].rank, posts[-1].id)
+        return posts, next_cursor
 
-    async def get_all_posts(self, username: str) -> list[LittlePostSchema]:
-        return await self.repo.get_all(username)
+    async def count_posts(self, username: str) -> int:
+        return await self.repo.count(username)
 
     async def unpublish_post(self, post_id: int) -> str:
         draft_id = await self.repo.unpublish(post_id)
+        self.after_commit(invalidate_post_page, self.redis_client, post_id)
+        self.after_commit(invalidate_feed, self.redis_client)
         url = f"{settings.PREFIX}/{APIPrefixesEnum.DRAFTS.value}/{draft_id}"
         return url[1:]
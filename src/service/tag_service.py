@@ -0,0 +1,26 @@
+from src.core.exceptions import InvalidCursorError
+from src.core.schemas import LittlePostSchema
+from src.core.utils import encode_cursor, decode_cursor
+from src.repository.tag_repo import TagRepo
+from src.service import Service
+
+
+class TagService(Service[TagRepo]):
+    async def get_posts(
+        self, tag: str, how_many: int, cursor: str | None = None
+    ) -> tuple[list[LittlePostSchema], str | None]:
+        after = None
+        if cursor is not None:
+            values = decode_cursor(cursor)
+            if len(values) != 1 or type(values[0]) is not int:  # noqa E721
+                raise InvalidCursorError(cursor)
+            (after,) = values
+
+        posts = await self.repo.get_posts(tag.lower(), how_many, after)
+        next_cursor = None
+        if len(posts) == how_many:
+            next_cursor = encode_cursor(posts[-1].id)
+        return posts, next_cursor
+
+    async def count_posts(self, tag: str) -> int:
+        return await self.repo.count(tag.lower())
@@ -0,0 +1,100 @@
+import asyncio
+import logging
+
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from src.core.config import settings
+from src.core.redis_db import RedisClient
+from src.repository.post_repo import PostRepo
+from src.repository.unitofwork import UnitOfWork
+from src.service import Service
+
+logger = logging.getLogger(__name__)
+
+_DIRTY_KEY = "posts:views:dirty"
+
+
+def _views_key(post_id: int) -> str:
+    return f"posts:{post_id}:views"
+
+
+def _readers_key(post_id: int) -> str:
+    return f"posts:{post_id}:readers"
+
+
+class ViewService(Service[PostRepo]):
+    """Count post views in Redis and flush them to Postgres in batches
+
+    A view costs a few Redis commands and no database write; the flusher
+    moves the accumulated deltas to `posts.views` every
+    SRB_VIEWS_FLUSH_SECONDS. Unique readers are estimated with a HyperLogLog
+    per post, `posts.readers` holds its latest count.
+    """
+
+    async def record_view(self, post_id: int, reader: str | None):
+        # one round trip; the delta must land before the post is marked dirty,
+        # or a flush in between would pop the mark and leave the delta behind
+        commands = [("incr", _views_key(post_id)), ("sadd", _DIRTY_KEY, post_id)]
+        if settings.SRB_VIEWS_COUNT_READERS and reader is not None:
+            commands.append(("pfadd", _readers_key(post_id), reader))
+        await self.redis_client.multi(*commands)
+
+    async def take_batch(self, batch_size: int) -> list[tuple[int, int, int]]:
+        """Pop up to `batch_size` dirty posts with their pending view deltas"""
+        post_ids = [
+            int(post_id)
+            for post_id in await self.redis_client.spop(_DIRTY_KEY, batch_size)
+        ]
+        deltas = await asyncio.gather(
+            *(self.redis_client.getdel(_views_key(post_id), 0) for post_id in post_ids)
+        )
+        readers = await asyncio.gather(
+            *(self.redis_client.pfcount(_readers_key(post_id)) for post_id in post_ids)
+        )
+        return list(zip(post_ids, deltas, readers, strict=True))
+
+    async def put_back(self, batch: list[tuple[int, int, int]]):
+        """Return the deltas of a batch which could not be written"""
+        await asyncio.gather(
+            *(
+                self.redis_client.incr(_views_key(post_id), delta)
+                for post_id, delta, _ in batch
+                if delta
+            )
+        )
+        await self.redis_client.sadd(_DIRTY_KEY, *(post_id for post_id, *_ in batch))
+
+    async def flush(self, session_maker: async_sessionmaker, batch_size: int) -> int:
+        """Write one batch to Postgres, return its size"""
+        batch = await self.take_batch(batch_size)
+        if not batch:
+            return 0
+        try:
+            async with UnitOfWork(session_maker) as session:
+                await PostRepo(session).add_views(batch)
+        except BaseException:
+            await self.put_back(batch)
+            raise
+        return len(batch)
+
+
+async def run_views_flusher(
+    session_maker: async_sessionmaker, redis_client: RedisClient, interval: float
+):
+    service = ViewService(None, redis_client)
+    batch_size = settings.SRB_VIEWS_FLUSH_BATCH_SIZE
+
+    async def flush_all():
+        while await service.flush(session_maker, batch_size) == batch_size:
+            pass
+
+    while True:
+        try:
+            await asyncio.sleep(interval)
+            await flush_all()
+        except asyncio.CancelledError:
+            # the pending deltas, on shutdown
+            await flush_all()
+            raise
+        except Exception:
+            logger.exception("flushing post views failed, retrying next interval")
@@ -1,17 +1,24 @@
+import asyncio
 from typing import Annotated, Literal
 
 from fastapi import APIRouter, Depends, Query
 from sqlalchemy.ext.asyncio import async_sessionmaker
 from starlette import status
+from starlette.requests import Request
+from starlette.responses import Response, StreamingResponse
 
 from src.core.acl import get_permission_setting, ACLSetting, check_permission
+from src.core.config import settings
 from src.core.database import get_db_sessionmaker
 from src.core.depends import get_current_user_from_db
 from src.core.enums import RoutesEnum, APIPrefixesEnum
+from src.core.events import CommentEventBroker, get_comment_event_broker
+from src.core.redis_db import RedisClient, get_redis_client
 from src.core.schemas import (
     UserSchema,
     CreateCommentReplySchema,
     CommentReplySchema,
+    CommentTreeSchema,
 )
 from src.repository.comment_repo import CommentReplyRepo
 from src.repository.unitofwork import UnitOfWork
@@ -19,6 +26,11 @@ from src.service.comment_service import CommentReplyService
 
 router = APIRouter(prefix=f"/{APIPrefixesEnum.COMMENTS.value}")
 
+CURSOR_DESCRIPTION = (
+    "Value of the `X-Next-Cursor` header of the previous page. "
+    "If given, `page` is ignored."
+)
+
 
 @router.post(
     "/{post_id}", response_model=CommentReplySchema, status_code=status.HTTP_201_CREATED
@@ -27,11 +39,12 @@ async def add_comment(
     post_id: int,
     comment: CreateCommentReplySchema,
     session_maker: Annotated[async_sessionmaker, Depends(get_db_sessionmaker)],
+    redis_client: Annotated[RedisClient, Depends(get_redis_client)],
     user: Annotated[UserSchema, Depends(get_current_user_from_db)],
 ):
     async with UnitOfWork(session_maker) as session:
         repo = CommentReplyRepo(session)
-        service = CommentReplyService(repo)
+        service = CommentReplyService(repo, redis_client)
         comment = await service.create_comment(post_id, comment, user.username)
     return comment
 
@@ -46,43 +59,118 @@ async def add_reply(
     comment_id: int,
     reply: CreateCommentReplySchema,
     session_maker: Annotated[async_sessionmaker, Depends(get_db_sessionmaker)],
+    redis_client: Annotated[RedisClient, Depends(get_redis_client)],
     user: Annotated[UserSchema, Depends(get_current_user_from_db)],
 ):
     async with UnitOfWork(session_maker) as session:
         repo = CommentReplyRepo(session)
-        service = CommentReplyService(repo)
+        service = CommentReplyService(repo, redis_client)
         reply = await service.create_reply(post_id, comment_id, reply, user.username)
     return reply
 
 
 @router.get("/{post_id}", response_model=list[CommentReplySchema])
 async def get_comments(
+    response: Response,
     post_id: int,
     session_maker: Annotated[async_sessionmaker, Depends(get_db_sessionmaker)],
+    redis_client: Annotated[RedisClient, Depends(get_redis_client)],
     page: Annotated[int, Query(ge=1)] = 1,
     how_many: Annotated[int, Query(ge=5, title="how-many")] = 5,
     order: Annotated[Literal["first", "last", "most_replied"], Query()] = "last",
+    cursor: Annotated[str | None, Query(description=CURSOR_DESCRIPTION)] = None,
 ):
     async with UnitOfWork(session_maker) as session:
         repo = CommentReplyRepo(session)
-        service = CommentReplyService(repo)
-        comments = await service.get_comments(post_id, page, how_many, order)
+        service = CommentReplyService(repo, redis_client)
+        comments, next_cursor = await service.get_comments(
+            post_id, page, how_many, order, cursor
+        )
+    if next_cursor is not None:
+        response.headers["X-Next-Cursor"] = next_cursor
     return comments
 
 
+async def _event_stream(
+    request: Request, broker: CommentEventBroker, post_id: int, queue: asyncio.Queue
+):
+    try:
+        yield ": connected\n\n"
+        while True:
+            try:
+                event = await asyncio.wait_for(
+                    queue.get(), timeout=settings.SRB_SSE_KEEPALIVE_SECONDS
+                )
+            except asyncio.TimeoutError:
+                if await request.is_disconnected():
+                    break
+                yield ": keep-alive\n\n"
+                continue
+            if event is None:
+                # this client fell behind, it should reconnect and refetch
+                yield "event: overflow\ndata: {}\n\n"
+                break
+            if isinstance(event, bytes):
+                event = event.decode()
+            yield f"data: {event}\n\n"
+    finally:
+        broker.unsubscribe(post_id, queue)
+
+
+# must be registered before `/{post_id}/{comment_id}`
+@router.get("/{post_id}/events", response_class=StreamingResponse)
+async def comment_events(
+    request: Request,
+    post_id: int,
+    broker: Annotated[CommentEventBroker, Depends(get_comment_event_broker)],
+):
+    queue = broker.subscribe(post_id)
+    return StreamingResponse(
+        _event_stream(request, broker, post_id, queue),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+# must be registered before `/{post_id}/{comment_id}`
+@router.get("/{post_id}/tree", response_model=list[CommentTreeSchema])
+async def get_thread(
+    post_id: int,
+    session_maker: Annotated[async_sessionmaker, Depends(get_db_sessionmaker)],
+    comment_id: Annotated[
+        int | None, Query(description="Only return the subtree of this comment.")
+    ] = None,
+    depth: Annotated[
+        int | None, Query(ge=1, description="How many levels of the tree to return.")
+    ] = None,
+):
+    async with UnitOfWork(session_maker) as session:
+        repo = CommentReplyRepo(session)
+        service = CommentReplyService(repo)
+        thread = await service.get_thread(post_id, comment_id, depth)
+    return thread
+
+
 @router.get("/{post_id}/{comment_id}", response_model=list[CommentReplySchema])
 async def get_replies(
+    response: Response,
     post_id: int,
     comment_id: int,
     session_maker: Annotated[async_sessionmaker, Depends(get_db_sessionmaker)],
+    redis_client: Annotated[RedisClient, Depends(get_redis_client)],
     page: Annotated[int, Query(ge=1)] = 1,
     how_many: Annotated[int, Query(ge=5, title="how-many")] = 5,
     order: Annotated[Literal["first", "last", "most_replied"], Query()] = "last",
+    cursor: Annotated[str | None, Query(description=CURSOR_DESCRIPTION)] = None,
 ):
     async with UnitOfWork(session_maker) as session:
         repo = CommentReplyRepo(session)
-        service = CommentReplyService(repo)
-        comments = await service.get_replies(post_id, comment_id, page, how_many, order)
+        service = CommentReplyService(repo, redis_client)
+        comments, next_cursor = await service.get_replies(
+            post_id, comment_id, page, how_many, order, cursor
+        )
+    if next_cursor is not None:
+        response.headers["X-Next-Cursor"] = next_cursor
     return comments
 
 
@@ -92,11 +180,12 @@ async def update_comment(
     comment_id: int,
     comment: CreateCommentReplySchema,
     session_maker: Annotated[async_sessionmaker, Depends(get_db_sessionmaker)],
+    redis_client: Annotated[RedisClient, Depends(get_redis_client)],
     user: Annotated[UserSchema, Depends(get_current_user_from_db)],
 ):
     async with UnitOfWork(session_maker) as session:
         repo = CommentReplyRepo(session)
-        service = CommentReplyService(repo)
+        service = CommentReplyService(repo, redis_client)
         comment = await service.update_comment(
             post_id, comment_id, comment, user.username
         )
@@ -108,6 +197,7 @@ async def delete_comment(
     post_id: int,
     comment_id: int,
     session_maker: Annotated[async_sessionmaker, Depends(get_db_sessionmaker)],
+    redis_client: Annotated[RedisClient, Depends(get_redis_client)],
     user: Annotated[UserSchema, Depends(get_current_user_from_db)],
     permission_setting: Annotated[ACLSetting, Depends(get_permission_setting)],
 ):
@@ -120,5 +210,5 @@ async def delete_comment(
             permission_setting=permission_setting,
         )
         repo = CommentReplyRepo(session)
-        service = CommentReplyService(repo)
+        service = CommentReplyService(repo, redis_client)
         await service.delete_comment(post_id, comment_id)
@@ -1,15 +1,17 @@
 from typing import Annotated
 
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, Query, Header
 from sqlalchemy.ext.asyncio import async_sessionmaker
 from starlette import status
 from starlette.requests import Request
-from starlette.responses import RedirectResponse
+from starlette.responses import RedirectResponse, Response
 
 from src.core.acl import get_permission_setting, ACLSetting, check_permission
+from src.core.cache import draft_etag, etag_matches
 from src.core.database import get_db_sessionmaker
 from src.core.depends import get_current_user_from_db
 from src.core.enums import RoutesEnum, APIPrefixesEnum
+from src.core.redis_db import RedisClient, get_redis_client
 from src.core.schemas import (
     LittleDraftSchema,
     UserSchema,
@@ -17,11 +19,17 @@ from src.core.schemas import (
     CreateDraftSchema,
     UpdateDraftSchema,
     PublishDraftSchema,
+    PatchDraftSchema,
+    DraftRevisionSchema,
+    LittleDraftRevisionSchema,
+    DraftRevisionBodySchema,
 )
 from src.repository.draft_repo import DraftRepo
+from src.repository.draft_revision_repo import DraftRevisionRepo
 from src.repository.post_repo import PostRepo
 from src.repository.unitofwork import UnitOfWork
 from src.service.draft_service import DraftService
+from src.service.draft_revision_service import DraftRevisionService
 from src.service.post_service import PostService
 
 router = APIRouter(prefix=f"/{APIPrefixesEnum.DRAFTS.value}")
@@ -46,14 +54,24 @@ async def create_draft(
     status_code=status.HTTP_200_OK,
 )
 async def get_all_drafts(
+    response: Response,
     session_maker: Annotated[async_sessionmaker, Depends(get_db_sessionmaker)],
     user: Annotated[UserSchema, Depends(get_current_user_from_db)],
     desc_order: Annotated[bool, Query(description="DESC if True ASC otherwise.")] = True,
+    how_many: Annotated[int, Query(ge=1, le=100, title="how-many")] = 20,
+    cursor: Annotated[
+        str | None,
+        Query(description="Value of the `X-Next-Cursor` header of the previous page."),
+    ] = None,
 ):
     async with UnitOfWork(session_maker) as session:
         repo = DraftRepo(session)
         service = DraftService(repo)
-        drafts = await service.get_all(user.username, desc_order)
+        drafts, next_cursor = await service.get_all(
+            user.username, desc_order, how_many, cursor
+        )
+    if next_cursor is not None:
+        response.headers["X-Next-Cursor"] = next_cursor
     return drafts
 
 
@@ -63,11 +81,17 @@ async def get_all_drafts(
     status_code=status.HTTP_200_OK,
 )
 async def get_all_drafts_by_username(
+    response: Response,
     username: str,
     session_maker: Annotated[async_sessionmaker, Depends(get_db_sessionmaker)],
     user: Annotated[UserSchema, Depends(get_current_user_from_db)],
     permission_setting: Annotated[ACLSetting, Depends(get_permission_setting)],
     desc_order: Annotated[bool, Query(description="DESC if True ASC otherwise.")] = True,
+    how_many: Annotated[int, Query(ge=1, le=100, title="how-many")] = 20,
+    cursor: Annotated[
+        str | None,
+        Query(description="Value of the `X-Next-Cursor` header of the previous page."),
+    ] = None,
 ):
     async with UnitOfWork(session_maker) as session:
         await check_permission(
@@ -79,23 +103,100 @@ async def get_all_drafts_by_username(
         )
         repo = DraftRepo(session)
         service = DraftService(repo)
-        drafts = await service.get_all(username, desc_order)
+        drafts, next_cursor = await service.get_all(
+            username, desc_order, how_many, cursor
+        )
+    if next_cursor is not None:
+        response.headers["X-Next-Cursor"] = next_cursor
     return drafts
 
 
-@router.get("/{draft_id}", response_model=DraftSchema, status_code=status.HTTP_200_OK)
+@router.get(
+    "/{draft_id}",
+    response_model=DraftSchema,
+    status_code=status.HTTP_200_OK,
+    responses={
+        status.HTTP_304_NOT_MODIFIED: {"description": "The draft matches If-None-Match"}
+    },
+)
 async def get_one_draft(
+    response: Response,
     draft_id: int,
     session_maker: Annotated[async_sessionmaker, Depends(get_db_sessionmaker)],
     user: Annotated[UserSchema, Depends(get_current_user_from_db)],
+    if_none_match: Annotated[str | None, Header()] = None,
 ):
     async with UnitOfWork(session_maker) as session:
         repo = DraftRepo(session)
         service = DraftService(repo)
         draft = await service.get_one(draft_id, user.username)
+
+    etag = draft_etag(draft.id, draft.revision)
+    if etag_matches(etag, if_none_match):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+    response.headers["ETag"] = etag
     return draft
 
 
+@router.get(
+    "/{draft_id}/revisions",
+    response_model=list[LittleDraftRevisionSchema],
+    status_code=status.HTTP_200_OK,
+    description=(
+        "The earlier revisions of the draft, newest first. Revisions older than "
+        "SRB_DRAFT_REVISIONS_RETENTION_DAYS are compacted: only the snapshots "
+        "(`is_snapshot: true`) are kept and listed."
+    ),
+)
+async def get_draft_revisions(
+    response: Response,
+    draft_id: int,
+    session_maker: Annotated[async_sessionmaker, Depends(get_db_sessionmaker)],
+    user: Annotated[UserSchema, Depends(get_current_user_from_db)],
+    how_many: Annotated[int, Query(ge=1, le=100, title="how-many")] = 20,
+    cursor: Annotated[
+        str | None,
+        Query(description="Value of the `X-Next-Cursor` header of the previous page."),
+    ] = None,
+):
+    async with UnitOfWork(session_maker) as session:
+        repo = DraftRevisionRepo(session)
+        service = DraftRevisionService(repo)
+        revisions, next_cursor = await service.get_all(
+            draft_id, user.username, how_many, cursor
+        )
+    if next_cursor is not None:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return revisions
+
+
+@router.get(
+    "/{draft_id}/revisions/{revision}",
+    response_model=DraftRevisionBodySchema,
+    status_code=status.HTTP_200_OK,
+    description=(
+        "One revision of the draft, rebuilt from the nearest newer snapshot. "
+        "Past the retention period only the snapshots are readable."
+    ),
+    responses={
+        status.HTTP_404_NOT_FOUND: {
+            "description": "No such draft or revision, or the revision was compacted"
+        }
+    },
+)
+async def get_draft_revision(
+    draft_id: int,
+    revision: int,
+    session_maker: Annotated[async_sessionmaker, Depends(get_db_sessionmaker)],
+    user: Annotated[UserSchema, Depends(get_current_user_from_db)],
+):
+    async with UnitOfWork(session_maker) as session:
+        repo = DraftRevisionRepo(session)
+        service = DraftRevisionService(repo)
+        revision = await service.get_one(draft_id, user.username, revision)
+    return revision
+
+
 @router.get(
     "/{username}/{draft_id}",
     response_model=DraftSchema,
@@ -122,29 +223,73 @@ async def get_one_draft_by_username(
     return draft
 
 
-@router.put("/{draft_id}", response_model=DraftSchema, status_code=status.HTTP_200_OK)
+@router.put(
+    "/{draft_id}",
+    response_model=DraftSchema,
+    status_code=status.HTTP_200_OK,
+    responses={
+        status.HTTP_412_PRECONDITION_FAILED: {
+            "description": "The draft changed since the ETag in If-Match, refetch it"
+        }
+    },
+)
 async def update_draft(
+    response: Response,
     draft_id: int,
     draft: UpdateDraftSchema,
     session_maker: Annotated[async_sessionmaker, Depends(get_db_sessionmaker)],
     user: Annotated[UserSchema, Depends(get_current_user_from_db)],
+    redis_client: Annotated[RedisClient, Depends(get_redis_client)],
+    if_match: Annotated[str | None, Header()] = None,
 ):
     async with UnitOfWork(session_maker) as session:
         repo = DraftRepo(session)
-        service = DraftService(repo)
-        draft = await service.update_draft(draft_id, draft, user.username)
+        service = DraftService(repo, redis_client)
+        draft = await service.update_draft(draft_id, draft, user.username, if_match)
+    response.headers["ETag"] = draft_etag(draft.id, draft.revision)
     return draft
 
 
+@router.patch(
+    "/{draft_id}",
+    response_model=DraftRevisionSchema,
+    status_code=status.HTTP_200_OK,
+    responses={
+        status.HTTP_409_CONFLICT: {
+            "description": "The draft is past `revision`, refetch and rebase the edits"
+        },
+        status.HTTP_412_PRECONDITION_FAILED: {
+            "description": "`revision` is not the one of the ETag in If-Match"
+        },
+    },
+)
+async def patch_draft(
+    response: Response,
+    draft_id: int,
+    patch: PatchDraftSchema,
+    session_maker: Annotated[async_sessionmaker, Depends(get_db_sessionmaker)],
+    user: Annotated[UserSchema, Depends(get_current_user_from_db)],
+    redis_client: Annotated[RedisClient, Depends(get_redis_client)],
+    if_match: Annotated[str | None, Header()] = None,
+):
+    async with UnitOfWork(session_maker) as session:
+        repo = DraftRepo(session)
+        service = DraftService(repo, redis_client)
+        revision = await service.patch_draft(draft_id, patch, user.username, if_match)
+    response.headers["ETag"] = draft_etag(draft_id, revision.revision)
+    return revision
+
+
 @router.delete("/{draft_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_draft(
     draft_id: int,
     session_maker: Annotated[async_sessionmaker, Depends(get_db_sessionmaker)],
     user: Annotated[UserSchema, Depends(get_current_user_from_db)],
+    redis_client: Annotated[RedisClient, Depends(get_redis_client)],
 ):
     async with UnitOfWork(session_maker) as session:
         repo = DraftRepo(session)
-        service = DraftService(repo)
+        service = DraftService(repo, redis_client)
         await service.delete_draft(draft_id, user.username)
 
 
@@ -157,12 +302,13 @@ async def open_read(
     username: str,
     slug: str,
     session_maker: Annotated[async_sessionmaker, Depends(get_db_sessionmaker)],
+    redis_client: Annotated[RedisClient, Depends(get_redis_client)],
 ):
     async with UnitOfWork(session_maker) as session:
         repo = DraftRepo(session)
-        service = DraftService(repo)
-        draft = await service.get_global(username, slug)
-    return draft
+        service = DraftService(repo, redis_client)
+        body = await service.get_global_page(username, slug)
+    return Response(body, media_type="application/json")
 
 
 @router.post(
@@ -176,9 +322,10 @@ async def publish_draft(
     post: PublishDraftSchema,
     session_maker: Annotated[async_sessionmaker, Depends(get_db_sessionmaker)],
     user: Annotated[UserSchema, Depends(get_current_user_from_db)],
+    redis_client: Annotated[RedisClient, Depends(get_redis_client)],
 ):
     async with UnitOfWork(session_maker) as session:
         repo = PostRepo(session)
-        service = PostService(repo)
+        service = PostService(repo, redis_client)
         link = await service.create_post(draft_id, post, user.username)
     return f"{str(reqeust.base_url)}@{user.username}/{link}"
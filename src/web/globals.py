@@ -1,14 +1,19 @@
 from typing import Annotated
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Header, Query
 from sqlalchemy.ext.asyncio import async_sessionmaker
 from starlette import status
+from starlette.requests import Request
+from starlette.responses import Response
 
+from src.core.cache import etag_matches
 from src.core.database import get_db_sessionmaker
-from src.core.schemas import PostSchema
+from src.core.redis_db import RedisClient, get_redis_client
+from src.core.schemas import PostSchema, BodyFormat
 from src.repository.post_repo import PostRepo
 from src.repository.unitofwork import UnitOfWork
 from src.service.post_service import PostService
+from src.service.view_service import ViewService
 
 router = APIRouter()
 
@@ -17,14 +22,30 @@ router = APIRouter()
     "/@{username}/{link}",
     response_model=PostSchema,
     status_code=status.HTTP_200_OK,
+    responses={status.HTTP_304_NOT_MODIFIED: {"description": "Not Modified"}},
 )
 async def get_global(
     username: str,
     link: str,
     session_maker: Annotated[async_sessionmaker, Depends(get_db_sessionmaker)],
+    redis_client: Annotated[RedisClient, Depends(get_redis_client)],
+    request: Request,
+    body_format: Annotated[
+        BodyFormat,
+        Query(description="`html` returns the body rendered on publish."),
+    ] = "markdown",
+    if_none_match: Annotated[str | None, Header()] = None,
 ):
     async with UnitOfWork(session_maker) as session:
         repo = PostRepo(session)
-        service = PostService(repo)
-        post = await service.get_global_post(username, link)
-    return post
+        service = PostService(repo, redis_client)
+        post_id, body, etag = await service.get_global_post_page(
+            username, link, body_format
+        )
+
+    reader = request.client.host if request.client is not None else None
+    await ViewService(None, redis_client).record_view(post_id, reader)
+
+    if etag_matches(etag, if_none_match):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+    return Response(body, media_type="application/json", headers={"ETag": etag})
@@ -1,15 +1,16 @@
 from typing import Annotated
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query
 from sqlalchemy.ext.asyncio import async_sessionmaker
 from starlette.requests import Request
-from starlette.responses import RedirectResponse
+from starlette.responses import RedirectResponse, Response
 
 from src.core.acl import check_permission, ACLSetting, get_permission_setting
 from src.core.database import get_db_sessionmaker
 from src.core.depends import get_current_user_from_db, get_tokens_from_cookies
 from src.core.enums import APIPrefixesEnum, RoutesEnum
-from src.core.schemas import LittlePostSchema, UserSchema
+from src.core.redis_db import RedisClient, get_redis_client
+from src.core.schemas import LittlePostSchema, SearchResultSchema, UserSchema
 from src.repository.post_repo import PostRepo
 from src.repository.unitofwork import UnitOfWork
 from src.service.post_service import PostService
@@ -17,27 +18,94 @@ from src.service.post_service import PostService
 router = APIRouter(prefix=f"/{APIPrefixesEnum.POSTS.value}")
 
 
+CURSOR_DESCRIPTION = "Value of the `X-Next-Cursor` header of the previous page."
+TOTAL_DESCRIPTION = "Send the number of posts of the author in `X-Total-Count`."
+
+
 @router.get("/", response_model=list[LittlePostSchema])
 async def get_self_posts(
+    response: Response,
     session_maker: Annotated[async_sessionmaker, Depends(get_db_sessionmaker)],
     user: Annotated[UserSchema, Depends(get_current_user_from_db)],
+    how_many: Annotated[int, Query(ge=1, le=100, title="how-many")] = 20,
+    cursor: Annotated[str | None, Query(description=CURSOR_DESCRIPTION)] = None,
+    total: Annotated[bool, Query(description=TOTAL_DESCRIPTION)] = False,
+):
+    return await _list_posts(
+        response, session_maker, user.username, how_many, cursor, total
+    )
+
+
+# `/feed` and `/search` must be registered before `/{username}`
+@router.get("/feed", response_model=list[LittlePostSchema])
+async def get_feed(
+    response: Response,
+    session_maker: Annotated[async_sessionmaker, Depends(get_db_sessionmaker)],
+    redis_client: Annotated[RedisClient, Depends(get_redis_client)],
+    how_many: Annotated[int, Query(ge=1, le=100, title="how-many")] = 20,
+    cursor: Annotated[str | None, Query(description=CURSOR_DESCRIPTION)] = None,
+):
+    async with UnitOfWork(session_maker) as session:
+        repo = PostRepo(session)
+        service = PostService(repo, redis_client)
+        posts, next_cursor = await service.get_feed(how_many, cursor)
+    if next_cursor is not None:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return posts
+
+
+@router.get("/search", response_model=list[SearchResultSchema])
+async def search_posts(
+    response: Response,
+    q: Annotated[
+        str,
+        Query(
+            min_length=1,
+            max_length=256,
+            description='Words, `"quoted phrases"`, `or` and `-excluded` words.',
+        ),
+    ],
+    session_maker: Annotated[async_sessionmaker, Depends(get_db_sessionmaker)],
+    how_many: Annotated[int, Query(ge=1, le=100, title="how-many")] = 20,
+    cursor: Annotated[str | None, Query(description=CURSOR_DESCRIPTION)] = None,
 ):
     async with UnitOfWork(session_maker) as session:
         repo = PostRepo(session)
         service = PostService(repo)
-        posts = await service.get_all_posts(user.username)
+        posts, next_cursor = await service.search(q, how_many, cursor)
+    if next_cursor is not None:
+        response.headers["X-Next-Cursor"] = next_cursor
     return posts
 
 
 @router.get("/{username}", response_model=list[LittlePostSchema])
 async def get_posts(
+    response: Response,
     username: str,
     session_maker: Annotated[async_sessionmaker, Depends(get_db_sessionmaker)],
+    how_many: Annotated[int, Query(ge=1, le=100, title="how-many")] = 20,
+    cursor: Annotated[str | None, Query(description=CURSOR_DESCRIPTION)] = None,
+    total: Annotated[bool, Query(description=TOTAL_DESCRIPTION)] = False,
 ):
+    return await _list_posts(response, session_maker, username, how_many, cursor, total)
+
+
+async def _list_posts(
+    response: Response,
+    session_maker: async_sessionmaker,
+    username: str,
+    how_many: int,
+    cursor: str | None,
+    total: bool,
+) -> list[LittlePostSchema]:
     async with UnitOfWork(session_maker) as session:
         repo = PostRepo(session)
         service = PostService(repo)
-        posts = await service.get_all_posts(username)
+        posts, next_cursor = await service.get_all_posts(username, how_many, cursor)
+        if total:
+            response.headers["X-Total-Count"] = str(await service.count_posts(username))
+    if next_cursor is not None:
+        response.headers["X-Next-Cursor"] = next_cursor
     return posts
 
 
@@ -49,13 +117,14 @@ async def unpublish_post(
     user: Annotated[UserSchema, Depends(get_current_user_from_db)],
     permission_setting: Annotated[ACLSetting, Depends(get_permission_setting)],
     tokens: Annotated[str, Depends(get_tokens_from_cookies)],
+    redis_client: Annotated[RedisClient, Depends(get_redis_client)],
 ):
     async with UnitOfWork(session_maker) as session:
         await check_permission(
             session, user, post_id, RoutesEnum.UNPUBLISH_POST, permission_setting
         )
         repo = PostRepo(session)
-        service = PostService(repo)
+        service = PostService(repo, redis_client)
         draft_url = await service.unpublish_post(post_id)
 
     rr = RedirectResponse(
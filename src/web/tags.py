@@ -0,0 +1,39 @@
+from typing import Annotated
+
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from starlette.responses import Response
+
+from src.core.database import get_db_sessionmaker
+from src.core.enums import APIPrefixesEnum
+from src.core.schemas import LittlePostSchema
+from src.repository.tag_repo import TagRepo
+from src.repository.unitofwork import UnitOfWork
+from src.service.tag_service import TagService
+
+router = APIRouter(prefix=f"/{APIPrefixesEnum.TAGS.value}")
+
+
+@router.get("/{tag}/posts", response_model=list[LittlePostSchema])
+async def get_tag_posts(
+    response: Response,
+    tag: str,
+    session_maker: Annotated[async_sessionmaker, Depends(get_db_sessionmaker)],
+    how_many: Annotated[int, Query(ge=1, le=100, title="how-many")] = 20,
+    cursor: Annotated[
+        str | None,
+        Query(description="Value of the `X-Next-Cursor` header of the previous page."),
+    ] = None,
+    total: Annotated[
+        bool, Query(description="Send the number of posts of the tag in `X-Total-Count`.")
+    ] = False,
+):
+    async with UnitOfWork(session_maker) as session:
+        repo = TagRepo(session)
+        service = TagService(repo)
+        posts, next_cursor = await service.get_posts(tag, how_many, cursor)
+        if total:
+            response.headers["X-Total-Count"] = str(await service.count_posts(tag))
+    if next_cursor is not None:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return posts
@@ -85,6 +85,7 @@ users_basic_url = base_url + f"{APIPrefixesEnum.USERS.value}"
 drafts_basic_url = base_url + f"{APIPrefixesEnum.DRAFTS.value}"
 posts_basic_url = base_url + f"{APIPrefixesEnum.POSTS.value}"
 comments_basic_url = base_url + f"{APIPrefixesEnum.COMMENTS.value}"
+tags_basic_url = base_url + f"{APIPrefixesEnum.TAGS.value}"
 
 draft_data = {"title": "title", "body": "body"}
 
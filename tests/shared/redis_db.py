@@ -1,6 +1,7 @@
 from src.core.utils import asingleton
 
 database = {}
+published: dict[str, list] = {}
 
 
 class RedisClientMock:
@@ -11,9 +12,39 @@ class RedisClientMock:
         database[name] = value
         return True
 
+    async def incr(self, name, amount: int = 1) -> int:
+        database[name] = database.get(name, 0) + amount
+        return database[name]
+
+    async def multi(self, *commands: tuple) -> list:
+        return [await getattr(self, command)(*args) for command, *args in commands]
+
+    async def getdel(self, name, default=None):
+        return database.pop(name, default)
+
+    async def sadd(self, name, *values) -> int:
+        members = database.setdefault(name, set())
+        added = {str(value).encode() for value in values} - members
+        members |= added
+        return len(added)
+
+    async def spop(self, name, count: int) -> list[bytes]:
+        members = database.get(name, set())
+        return [members.pop() for _ in range(min(count, len(members)))]
+
+    # an exact set stands in for the HyperLogLog
+    async def pfadd(self, name, *values) -> int:
+        return await self.sadd(name, *values)
+
+    async def pfcount(self, name) -> int:
+        return len(database.get(name, ()))
+
+    async def publish(self, channel: str, message: str) -> int:
+        published.setdefault(channel, []).append(message)
+        return 0
+
     async def delete(self, *names):
-        for name in names:
-            database.pop(name)
+        return any([database.pop(name, None) is not None for name in names])
 
     async def ttl(self, name) -> int:
         return 100
@@ -21,6 +52,7 @@ class RedisClientMock:
 
 def clear_database():
     database.clear()
+    published.clear()
 
 
 @asingleton
@@ -1,5 +1,16 @@
+import asyncio
+import json
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql
+
 from src.core.config import settings
 from src.core.enums import APIPrefixesEnum
+from src.core.events import CommentEventBroker, comment_events_channel
+from src.core.exceptions import TooManySubscribersError
+from src.repository.comment_repo import CommentReplyRepo
+from src.repository.models import CommentModel
 from tests.conftest import (
     create_post,
     create_draft,
@@ -7,10 +18,28 @@ from tests.conftest import (
     BaseTest,
     create_comment,
 )
+from tests.shared.database import ASessionMock
+from tests.shared.redis_db import database as redis_database, published
 
 bt = BaseTest()
 
 
+def explain(stmt) -> str:
+    sql = str(
+        stmt.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True})
+    )
+
+    async def run():
+        async with ASessionMock() as session:
+            conn = await session.connection()
+            # the test tables are tiny, make the planner show what it would use
+            await conn.exec_driver_sql("SET enable_seqscan = off")
+            plan = await conn.exec_driver_sql(f"EXPLAIN {sql}")
+            return "\n".join(plan.scalars())
+
+    return asyncio.run(run())
+
+
 def test_add_comment(client, refreshed_mahdi):
     headers, cookies = bt.headers_cookies_tuple(refreshed_mahdi)
     post_id = create_post(
@@ -222,3 +251,272 @@ def test_update_comment(client, refreshed_mahdi):
     assert data["parent_id"] is None
     assert data["username"] == "mahdi"
     assert data["reply_count"] == 0
+
+
+def test_reply_count_is_maintained(client, refreshed_mahdi):
+    h, c = bt.headers_cookies_tuple(refreshed_mahdi)
+    post_id = create_post(client, h, c, create_draft(client, h, c))
+    comment_id = create_comment(client, h, c, post_id)
+
+    reply_ids = [
+        client.post(
+            f"{comments_basic_url}/{post_id}/{comment_id}",
+            json={"comment": f"reply{idx}"},
+            headers=h,
+            cookies=c,
+        ).json()["id"]
+        for idx in range(2)
+    ]
+
+    response = client.get(f"{comments_basic_url}/{post_id}")
+    assert response.status_code == 200, response.text
+    assert response.json()[0]["reply_count"] == 2
+
+    response = client.delete(
+        f"{comments_basic_url}/{post_id}/{reply_ids[0]}", headers=h, cookies=c
+    )
+    assert response.status_code == 204, response.text
+
+    response = client.put(
+        f"{comments_basic_url}/{post_id}/{comment_id}",
+        json={"comment": "updated comment"},
+        headers=h,
+        cookies=c,
+    )
+    assert response.status_code == 200, response.text
+    assert response.json()["reply_count"] == 1
+
+
+def test_get_comments_with_cursor(client, refreshed_mahdi):
+    h, c = bt.headers_cookies_tuple(refreshed_mahdi)
+    post_id = create_post(client, h, c, create_draft(client, h, c))
+    for idx in range(1, 8):
+        create_comment(client, h, c, post_id, f"comment{idx}")
+
+    response = client.get(f"{comments_basic_url}/{post_id}", params={"order": "first"})
+    assert response.status_code == 200, response.text
+    assert [cmt["comment"] for cmt in response.json()] == [
+        f"comment{idx}" for idx in range(1, 6)
+    ]
+    cursor = response.headers["X-Next-Cursor"]
+
+    response = client.get(
+        f"{comments_basic_url}/{post_id}", params={"order": "first", "cursor": cursor}
+    )
+    assert response.status_code == 200, response.text
+    assert [cmt["comment"] for cmt in response.json()] == ["comment6", "comment7"]
+    assert "X-Next-Cursor" not in response.headers
+
+    # a cursor is bound to the order it was issued for
+    response = client.get(
+        f"{comments_basic_url}/{post_id}", params={"order": "last", "cursor": cursor}
+    )
+    assert response.status_code == 400, response.text
+
+    response = client.get(f"{comments_basic_url}/{post_id}", params={"cursor": "bad"})
+    assert response.status_code == 400, response.text
+
+
+def test_get_thread(client, refreshed_mahdi):
+    h, c = bt.headers_cookies_tuple(refreshed_mahdi)
+    post_id = create_post(client, h, c, create_draft(client, h, c))
+    c1_id = create_comment(client, h, c, post_id, "comment1")
+    create_comment(client, h, c, post_id, "comment2")
+
+    r1_id = client.post(
+        f"{comments_basic_url}/{post_id}/{c1_id}",
+        json={"comment": "reply1"},
+        headers=h,
+        cookies=c,
+    ).json()["id"]
+    client.post(
+        f"{comments_basic_url}/{post_id}/{r1_id}",
+        json={"comment": "reply1-1"},
+        headers=h,
+        cookies=c,
+    )
+
+    response = client.get(f"{comments_basic_url}/{post_id}/tree")
+    assert response.status_code == 200, response.text
+
+    data = response.json()
+    assert [cmt["comment"] for cmt in data] == ["comment1", "comment2"]
+    assert data[1]["replies"] == []
+    (reply,) = data[0]["replies"]
+    assert reply["comment"] == "reply1"
+    assert [cmt["comment"] for cmt in reply["replies"]] == ["reply1-1"]
+
+    response = client.get(
+        f"{comments_basic_url}/{post_id}/tree",
+        params={"comment_id": r1_id, "depth": 1},
+    )
+    assert response.status_code == 200, response.text
+
+    data = response.json()
+    assert [cmt["comment"] for cmt in data] == ["reply1"]
+    assert data[0]["replies"] == []
+
+
+def test_get_thread_not_found(client, refreshed_mahdi):
+    h, c = bt.headers_cookies_tuple(refreshed_mahdi)
+    response = client.get(f"{comments_basic_url}/100/tree")
+    assert response.status_code == 404, response.text
+
+    post_id = create_post(client, h, c, create_draft(client, h, c))
+    response = client.get(f"{comments_basic_url}/{post_id}/tree")
+    assert response.status_code == 200, response.text
+    assert response.json() == []
+
+    response = client.get(
+        f"{comments_basic_url}/{post_id}/tree", params={"comment_id": 100}
+    )
+    assert response.status_code == 404, response.text
+
+
+def test_comment_queries_use_indexes(client, refreshed_mahdi):
+    h, c = bt.headers_cookies_tuple(refreshed_mahdi)
+    post_id = create_post(client, h, c, create_draft(client, h, c))
+    comment_id = create_comment(client, h, c, post_id)
+    repo = CommentReplyRepo(session=None)
+
+    for order in ("first", "last"):
+        for parent_id in (None, comment_id):
+            stmt = repo._page_stmt(post_id, 2, 5, order, parent_id)
+            assert "ix_comments_post_parent_commented" in explain(stmt)
+
+    stmt = repo._page_stmt(post_id, 1, 5, "most_replied", after=(1, comment_id))
+    assert "ix_comments_post_parent_reply_count" in explain(stmt)
+
+    # the subtree lookup of delete (ltree <@)
+    root_path = select(CommentModel.path).where(CommentModel.id == comment_id)
+    stmt = select(CommentModel.id).where(
+        CommentModel.path.descendant_of(root_path.scalar_subquery())
+    )
+    assert "ix_comments_path" in explain(stmt)
+
+
+def test_comment_pages_are_cached_and_invalidated(client, refreshed_mahdi):
+    h, c = bt.headers_cookies_tuple(refreshed_mahdi)
+    post_id = create_post(client, h, c, create_draft(client, h, c))
+    comment_id = create_comment(client, h, c, post_id, "comment1")
+
+    response = client.get(f"{comments_basic_url}/{post_id}")
+    assert [cmt["comment"] for cmt in response.json()] == ["comment1"]
+    assert any(
+        key.startswith(f"comments:{post_id}:") and key.endswith(":page=1:5")
+        for key in redis_database
+    )
+
+    create_comment(client, h, c, post_id, "comment2")
+    response = client.get(f"{comments_basic_url}/{post_id}")
+    assert [cmt["comment"] for cmt in response.json()] == ["comment2", "comment1"]
+
+    client.put(
+        f"{comments_basic_url}/{post_id}/{comment_id}",
+        json={"comment": "updated comment"},
+        headers=h,
+        cookies=c,
+    )
+    response = client.get(f"{comments_basic_url}/{post_id}")
+    assert [cmt["comment"] for cmt in response.json()] == ["comment2", "updated comment"]
+
+    client.delete(f"{comments_basic_url}/{post_id}/{comment_id}", headers=h, cookies=c)
+    response = client.get(f"{comments_basic_url}/{post_id}")
+    assert [cmt["comment"] for cmt in response.json()] == ["comment2"]
+
+
+def test_delete_comment_removes_subtree(client, refreshed_mahdi):
+    h, c = bt.headers_cookies_tuple(refreshed_mahdi)
+    post_id = create_post(client, h, c, create_draft(client, h, c))
+    comment_id = create_comment(client, h, c, post_id)
+
+    parent_id = comment_id
+    for idx in range(3):
+        parent_id = client.post(
+            f"{comments_basic_url}/{post_id}/{parent_id}",
+            json={"comment": f"reply{idx}"},
+            headers=h,
+            cookies=c,
+        ).json()["id"]
+
+    response = client.delete(
+        f"{comments_basic_url}/{post_id}/{comment_id}", headers=h, cookies=c
+    )
+    assert response.status_code == 204, response.text
+
+    response = client.get(f"{comments_basic_url}/{post_id}/tree")
+    assert response.json() == []
+
+
+def test_comment_routes_post_not_found(client, refreshed_mahdi):
+    h, c = bt.headers_cookies_tuple(refreshed_mahdi)
+    post_id = create_post(client, h, c, create_draft(client, h, c))
+    comment_id = create_comment(client, h, c, post_id)
+
+    response = client.get(f"{comments_basic_url}/100")
+    assert response.status_code == 404, response.text
+
+    response = client.get(f"{comments_basic_url}/{post_id}", params={"page": 2})
+    assert response.status_code == 200, response.text
+    assert response.json() == []
+
+    response = client.put(
+        f"{comments_basic_url}/100/{comment_id}",
+        json={"comment": "updated comment"},
+        headers=h,
+        cookies=c,
+    )
+    assert response.status_code == 404, response.text
+    assert "Post" in bt.extract_error_message(response.json())[1]
+
+    response = client.put(
+        f"{comments_basic_url}/{post_id}/100",
+        json={"comment": "updated comment"},
+        headers=h,
+        cookies=c,
+    )
+    assert response.status_code == 404, response.text
+    assert "Comment" in bt.extract_error_message(response.json())[1]
+
+
+def test_comment_events_are_published(client, refreshed_mahdi):
+    h, c = bt.headers_cookies_tuple(refreshed_mahdi)
+    post_id = create_post(client, h, c, create_draft(client, h, c))
+    comment_id = create_comment(client, h, c, post_id)
+    reply_id = client.post(
+        f"{comments_basic_url}/{post_id}/{comment_id}",
+        json={"comment": "reply"},
+        headers=h,
+        cookies=c,
+    ).json()["id"]
+    client.delete(f"{comments_basic_url}/{post_id}/{comment_id}", headers=h, cookies=c)
+
+    events = [json.loads(e) for e in published[comment_events_channel(post_id)]]
+    assert events == [
+        {"type": "created", "id": comment_id, "parent_id": None},
+        {"type": "created", "id": reply_id, "parent_id": comment_id},
+        {"type": "deleted", "id": comment_id, "parent_id": None},
+    ]
+
+
+def test_comment_event_broker_backpressure():
+    async def run():
+        broker = CommentEventBroker(redis_client=None, max_subscribers=2, queue_size=2)
+        # don't start the redis listener
+        broker._listener = asyncio.get_running_loop().create_future()
+
+        fast, slow = broker.subscribe(1), broker.subscribe(1)
+        with pytest.raises(TooManySubscribersError):
+            broker.subscribe(2)
+
+        broker.dispatch(1, "e1")
+        broker.dispatch(1, "e2")
+        assert fast.get_nowait() == "e1"
+        broker.dispatch(1, "e3")
+
+        # the slow subscriber is dropped and told so, the fast one keeps going
+        assert slow.get_nowait() is None
+        assert [fast.get_nowait(), fast.get_nowait()] == ["e2", "e3"]
+        broker.subscribe(2)
+
+    asyncio.run(run())
@@ -40,6 +40,32 @@ def test_get_all_drafts(client, refreshed_mahdi):
         ]
 
 
+def test_get_all_drafts_paginated(client, refreshed_mahdi):
+    h, c = bt.headers_cookies_tuple(refreshed_mahdi)
+    ids = [create_draft(client, h, c) for _ in range(3)]
+
+    for desc_order, expected in ((True, ids[::-1]), (False, ids)):
+        seen, cursor = [], None
+        while True:
+            params = {"how_many": 2, "desc_order": desc_order}
+            if cursor is not None:
+                params["cursor"] = cursor
+            response = client.get(
+                f"{drafts_url}/all", params=params, headers=h, cookies=c
+            )
+            assert response.status_code == 200, response.text
+            seen.extend(draft["id"] for draft in response.json())
+            cursor = response.headers.get("X-Next-Cursor")
+            if cursor is None:
+                break
+        assert seen == expected
+
+    response = client.get(
+        f"{drafts_url}/all", params={"cursor": "bm90LWEtY3Vyc29y"}, headers=h, cookies=c
+    )
+    assert response.status_code == 400, response.text
+
+
 def test_get_one_draft(client, refreshed_mahdi):
     h, c = bt.headers_cookies_tuple(refreshed_mahdi)
     draft_id = create_draft(client, h, c)
@@ -113,6 +139,31 @@ def test_open_read(client, refreshed_mahdi):
     assert data["username"] == "mahdi"
 
 
+def test_open_read_cache_invalidation(client, refreshed_mahdi):
+    h, c = bt.headers_cookies_tuple(refreshed_mahdi)
+    created = client.post(
+        f"{drafts_basic_url}/",
+        headers=h,
+        cookies=c,
+        json={"title": "title", "body": "body"},
+    ).json()
+    link = created["draft_hash"]
+    assert client.get(link).json()["body"] == "body"
+
+    response = client.put(
+        f"{drafts_url}/{created['id']}",
+        json={"title": "title", "body": "new body"},
+        headers=h,
+        cookies=c,
+    )
+    assert response.status_code == 200, response.text
+    assert client.get(link).json()["body"] == "new body"
+
+    response = client.delete(f"{drafts_url}/{created['id']}", headers=h, cookies=c)
+    assert response.status_code == 204, response.text
+    assert client.get(link).status_code == 404
+
+
 def test_publish_post(client, refreshed_mahdi):
     h, c = bt.headers_cookies_tuple(refreshed_mahdi)
     draft_id = create_draft(client, h, c)
@@ -168,3 +219,222 @@ def test_publish_but_draft_not_found(client, refreshed_mahdi):
         cookies=c,
     )
     assert response.status_code == 404, response.text
+
+
+def test_patch_draft(client, refreshed_mahdi):
+    h, c = bt.headers_cookies_tuple(refreshed_mahdi)
+    draft_id = client.post(
+        f"{drafts_basic_url}/",
+        json={"title": "title", "body": "hello world"},
+        headers=h,
+        cookies=c,
+    ).json()["id"]
+    revision = client.get(f"{drafts_url}/{draft_id}", headers=h, cookies=c).json()[
+        "revision"
+    ]
+
+    response = client.patch(
+        f"{drafts_url}/{draft_id}",
+        json={
+            "revision": revision,
+            "edits": [
+                {"start": 11, "end": 11, "text": "!"},
+                {"start": 0, "end": 5, "text": "HELLO"},
+            ],
+        },
+        headers=h,
+        cookies=c,
+    )
+    assert response.status_code == 200, response.text
+    data = response.json()
+    assert set(data) == {"revision", "updated"}
+    assert data["revision"] == revision + 1
+
+    draft = client.get(f"{drafts_url}/{draft_id}", headers=h, cookies=c).json()
+    assert draft["body"] == "HELLO world!"
+    assert draft["title"] == "title"
+
+    # a stale revision is rejected
+    response = client.patch(
+        f"{drafts_url}/{draft_id}",
+        json={"revision": revision, "title": "new title"},
+        headers=h,
+        cookies=c,
+    )
+    assert response.status_code == 409, response.text
+
+    # edits out of the body's range
+    response = client.patch(
+        f"{drafts_url}/{draft_id}",
+        json={"revision": revision + 1, "edits": [{"start": 50, "end": 60}]},
+        headers=h,
+        cookies=c,
+    )
+    assert response.status_code == 400, response.text
+
+    # overlapping edits
+    response = client.patch(
+        f"{drafts_url}/{draft_id}",
+        json={
+            "revision": revision + 1,
+            "edits": [{"start": 0, "end": 5}, {"start": 3, "end": 6}],
+        },
+        headers=h,
+        cookies=c,
+    )
+    assert response.status_code == 422, response.text
+
+    response = client.patch(
+        f"{drafts_url}/{draft_id + 1}",
+        json={"revision": 1, "title": "x"},
+        headers=h,
+        cookies=c,
+    )
+    assert response.status_code == 404, response.text
+
+
+def test_patch_draft_max_edits(client, refreshed_mahdi):
+    h, c = bt.headers_cookies_tuple(refreshed_mahdi)
+    draft_id = client.post(
+        f"{drafts_basic_url}/",
+        json={"title": "title", "body": "a" * 256},
+        headers=h,
+        cookies=c,
+    ).json()["id"]
+
+    edits = [{"start": idx, "end": idx + 1, "text": "B"} for idx in range(256)]
+    response = client.patch(
+        f"{drafts_url}/{draft_id}",
+        json={"revision": 1, "edits": edits},
+        headers=h,
+        cookies=c,
+    )
+    assert response.status_code == 200, response.text
+
+    draft = client.get(f"{drafts_url}/{draft_id}", headers=h, cookies=c).json()
+    assert draft["body"] == "B" * 256
+
+    response = client.get(f"{drafts_url}/{draft_id}/revisions/1", headers=h, cookies=c)
+    assert response.json()["body"] == "a" * 256
+
+
+def test_draft_revisions(client, refreshed_mahdi, monkeypatch):
+    monkeypatch.setattr(settings, "SRB_DRAFT_SNAPSHOT_INTERVAL", 2)
+    h, c = bt.headers_cookies_tuple(refreshed_mahdi)
+    draft_id = client.post(
+        f"{drafts_basic_url}/",
+        json={"title": "v1", "body": "first line\nsecond line\n"},
+        headers=h,
+        cookies=c,
+    ).json()["id"]
+
+    bodies = {1: "first line\nsecond line\n"}
+    bodies[2] = "first line\nthe second line\nthird line\n"
+    response = client.put(
+        f"{drafts_url}/{draft_id}",
+        json={"title": "v2", "body": bodies[2]},
+        headers=h,
+        cookies=c,
+    )
+    assert response.status_code == 200, response.text
+
+    bodies[3] = "FIRST line\nthe second line\nthird line\n"
+    response = client.patch(
+        f"{drafts_url}/{draft_id}",
+        json={
+            "revision": 2,
+            "title": "v3",
+            "edits": [{"start": 0, "end": 5, "text": "FIRST"}],
+        },
+        headers=h,
+        cookies=c,
+    )
+    assert response.status_code == 200, response.text
+
+    bodies[4] = "third line\n"
+    response = client.put(
+        f"{drafts_url}/{draft_id}",
+        json={"title": "v4", "body": bodies[4]},
+        headers=h,
+        cookies=c,
+    )
+    assert response.status_code == 200, response.text
+
+    response = client.get(
+        f"{drafts_url}/{draft_id}/revisions",
+        params={"how_many": 2},
+        headers=h,
+        cookies=c,
+    )
+    assert response.status_code == 200, response.text
+    page = response.json()
+    assert [(r["revision"], r["is_snapshot"]) for r in page] == [(3, False), (2, True)]
+
+    response = client.get(
+        f"{drafts_url}/{draft_id}/revisions",
+        params={"how_many": 2, "cursor": response.headers["X-Next-Cursor"]},
+        headers=h,
+        cookies=c,
+    )
+    assert [r["revision"] for r in response.json()] == [1]
+
+    for revision, body in bodies.items():
+        response = client.get(
+            f"{drafts_url}/{draft_id}/revisions/{revision}", headers=h, cookies=c
+        )
+        assert response.status_code == 200, response.text
+        data = response.json()
+        assert data["body"] == body
+        assert data["title"] == f"v{revision}"
+
+    response = client.get(f"{drafts_url}/{draft_id}/revisions/5", headers=h, cookies=c)
+    assert response.status_code == 404, response.text
+
+
+def test_draft_etag(client, refreshed_mahdi):
+    h, c = bt.headers_cookies_tuple(refreshed_mahdi)
+    draft_id = create_draft(client, h, c)
+
+    response = client.get(f"{drafts_url}/{draft_id}", headers=h, cookies=c)
+    assert response.status_code == 200, response.text
+    etag = response.headers["ETag"]
+
+    response = client.get(
+        f"{drafts_url}/{draft_id}", headers={**h, "If-None-Match": etag}, cookies=c
+    )
+    assert response.status_code == 304, response.text
+    assert response.headers["ETag"] == etag
+
+    response = client.put(
+        f"{drafts_url}/{draft_id}",
+        json={"title": "title", "body": "first writer"},
+        headers={**h, "If-Match": etag},
+        cookies=c,
+    )
+    assert response.status_code == 200, response.text
+    new_etag = response.headers["ETag"]
+    assert new_etag != etag
+
+    # a second writer holding the old version does not overwrite the first
+    response = client.put(
+        f"{drafts_url}/{draft_id}",
+        json={"title": "title", "body": "second writer"},
+        headers={**h, "If-Match": etag},
+        cookies=c,
+    )
+    assert response.status_code == 412, response.text
+
+    response = client.get(
+        f"{drafts_url}/{draft_id}", headers={**h, "If-None-Match": etag}, cookies=c
+    )
+    assert response.status_code == 200, response.text
+    assert response.headers["ETag"] == new_etag
+    assert response.json()["body"] == "first writer"
+
+    response = client.put(
+        f"{drafts_url}/{draft_id + 1}",
+        json={"title": "title", "body": "body"},
+        headers={**h, "If-Match": etag},
+        cookies=c,
+    )
+    assert response.status_code == 404, response.text
@@ -1,5 +1,191 @@
+import asyncio
+
+from src.core.cache import post_page_key
+from src.service.view_service import ViewService
+from tests.conftest import (
+    BaseTest,
+    create_draft,
+    create_post,
+    create_comment,
+    posts_basic_url,
+    drafts_basic_url,
+)
+from tests.shared.database import ASessionMock
+from tests.shared.redis_db import database as redis_database, RedisClientMock
+
+bt = BaseTest()
+
+
 def test_get_global_post_not_found(client, refreshed_mahdi):
     link = "/@mahdi/123456789"
 
     response = client.get(link)
     assert response.status_code == 404, response.text
+
+
+def test_get_global_post_etag(client, refreshed_mahdi):
+    h, c = bt.headers_cookies_tuple(refreshed_mahdi)
+    create_post(client, h, c, create_draft(client, h, c))
+    slug = client.get(f"{posts_basic_url}/mahdi").json()[0]["slug"]
+
+    response = client.get(f"/@mahdi/{slug}")
+    assert response.status_code == 200, response.text
+    etag = response.headers["ETag"]
+    assert response.json()["title"] == "title"
+    assert post_page_key("mahdi", slug) in redis_database
+
+    response = client.get(f"/@mahdi/{slug}", headers={"If-None-Match": etag})
+    assert response.status_code == 304, response.text
+    assert response.headers["ETag"] == etag
+    assert not response.content
+
+    response = client.get(f"/@mahdi/{slug}", headers={"If-None-Match": '"other"'})
+    assert response.status_code == 200, response.text
+
+
+def test_get_global_post_cache_invalidation(client, refreshed_mahdi):
+    h, c = bt.headers_cookies_tuple(refreshed_mahdi)
+    post_id = create_post(client, h, c, create_draft(client, h, c))
+    slug = client.get(f"{posts_basic_url}/mahdi").json()[0]["slug"]
+
+    etag = client.get(f"/@mahdi/{slug}").headers["ETag"]
+    create_comment(client, h, c, post_id)
+    assert post_page_key("mahdi", slug) not in redis_database
+
+    response = client.get(f"/@mahdi/{slug}", headers={"If-None-Match": etag})
+    assert response.status_code == 200, response.text
+    assert response.json()["comments_count"] == 1
+
+    client.post(f"{posts_basic_url}/unpublish/{post_id}", headers=h, cookies=c)
+    assert client.get(f"/@mahdi/{slug}").status_code == 404
+
+
+def test_get_feed(client, refreshed_mahdi):
+    h, c = bt.headers_cookies_tuple(refreshed_mahdi)
+    for title in ("t1", "t2", "t3"):
+        create_post(client, h, c, create_draft(client, h, c, title))
+
+    response = client.get(f"{posts_basic_url}/feed?how_many=2")
+    assert response.status_code == 200, response.text
+    data = response.json()
+    assert [p["title"] for p in data] == ["t3", "t2"]
+    assert data[0]["username"] == "mahdi"
+    cursor = response.headers["X-Next-Cursor"]
+
+    response = client.get(f"{posts_basic_url}/feed?how_many=2&cursor={cursor}")
+    assert [p["title"] for p in response.json()] == ["t1"]
+    assert "X-Next-Cursor" not in response.headers
+
+
+def test_feed_head_is_cached(client, refreshed_mahdi):
+    h, c = bt.headers_cookies_tuple(refreshed_mahdi)
+    create_post(client, h, c, create_draft(client, h, c, "t1"))
+
+    assert [p["title"] for p in client.get(f"{posts_basic_url}/feed").json()] == ["t1"]
+    # one publish so far, so the feed is at generation 1
+    assert "posts:feed:1:20" in redis_database
+
+    # publishing moves the feed to a new generation
+    post_id = create_post(client, h, c, create_draft(client, h, c, "t2"))
+    assert [p["title"] for p in client.get(f"{posts_basic_url}/feed").json()] == [
+        "t2",
+        "t1",
+    ]
+
+    client.post(f"{posts_basic_url}/unpublish/{post_id}", headers=h, cookies=c)
+    assert [p["title"] for p in client.get(f"{posts_basic_url}/feed").json()] == ["t1"]
+
+
+def test_search_posts(client, refreshed_mahdi):
+    h, c = bt.headers_cookies_tuple(refreshed_mahdi)
+    drafts = [
+        ("Postgres indexes", "a <b>gin</b> index makes searching fast"),
+        ("cooking", "searching for the best pasta recipe with postgres fans"),
+        ("gardening", "nothing to see here"),
+    ]
+    for title, body in drafts:
+        draft_id = client.post(
+            f"{drafts_basic_url}/",
+            json={"title": title, "body": body},
+            headers=h,
+            cookies=c,
+        ).json()["id"]
+        create_post(client, h, c, draft_id)
+
+    response = client.get(f"{posts_basic_url}/search?q=postgres&how_many=1")
+    assert response.status_code == 200, response.text
+    (first,) = response.json()
+    # title matches rank above body matches
+    assert first["title"] == "Postgres indexes"
+    assert "<mark>" not in first["snippet"]
+    cursor = response.headers["X-Next-Cursor"]
+
+    response = client.get(
+        f"{posts_basic_url}/search?q=postgres&how_many=1&cursor={cursor}"
+    )
+    (second,) = response.json()
+    assert second["title"] == "cooking"
+    assert "<mark>postgres</mark>" in second["snippet"]
+
+    response = client.get(f"{posts_basic_url}/search?q=searching -pasta")
+    (only,) = response.json()
+    assert only["title"] == "Postgres indexes"
+    assert "&lt;b&gt;gin&lt;/b&gt;" in only["snippet"]
+    assert "<mark>searching</mark>" in only["snippet"]
+
+    assert client.get(f"{posts_basic_url}/search?q=nonexistentword").json() == []
+    assert (
+        client.get(f"{posts_basic_url}/search?q=postgres&cursor=garbage").status_code
+        == 400
+    )
+
+
+def test_post_views_are_flushed(client, refreshed_mahdi):
+    h, c = bt.headers_cookies_tuple(refreshed_mahdi)
+    post_id = create_post(client, h, c, create_draft(client, h, c))
+    slug = client.get(f"{posts_basic_url}/mahdi").json()[0]["slug"]
+
+    etag = client.get(f"/@mahdi/{slug}").headers["ETag"]
+    client.get(f"/@mahdi/{slug}")
+    client.get(f"/@mahdi/{slug}", headers={"If-None-Match": etag})
+    assert redis_database[f"posts:{post_id}:views"] == 3
+
+    service = ViewService(None, RedisClientMock())
+    assert asyncio.run(service.flush(ASessionMock, batch_size=10)) == 1
+    assert f"posts:{post_id}:views" not in redis_database
+    assert asyncio.run(service.flush(ASessionMock, batch_size=10)) == 0
+
+    # the cached page is only refreshed when it expires or is invalidated
+    redis_database.pop(post_page_key("mahdi", slug))
+    data = client.get(f"/@mahdi/{slug}").json()
+    assert data["views"] == 3
+    assert data["readers"] == 1
+
+
+def test_get_global_post_html(client, refreshed_mahdi):
+    h, c = bt.headers_cookies_tuple(refreshed_mahdi)
+    body = "# Hi\n\nsome **bold** text <script>alert(1)</script>\n\n- [a](javascript:x)"
+    draft_id = client.post(
+        f"{drafts_basic_url}/",
+        json={"title": "markdown", "body": body},
+        headers=h,
+        cookies=c,
+    ).json()["id"]
+    create_post(client, h, c, draft_id)
+    slug = client.get(f"{posts_basic_url}/mahdi").json()[0]["slug"]
+
+    data = client.get(f"/@mahdi/{slug}").json()
+    assert data["body"] == body
+    assert data["body_format"] == "markdown"
+
+    response = client.get(f"/@mahdi/{slug}?body_format=html")
+    assert response.status_code == 200, response.text
+    data = response.json()
+    assert data["body_format"] == "html"
+    assert data["body"] == (
+        "<h1>Hi</h1>\n"
+        "<p>some <strong>bold</strong> text "
+        "&lt;script&gt;alert(1)&lt;/script&gt;</p>\n"
+        "<ul>\n<li>a</li>\n</ul>"
+    )
+    assert post_page_key("mahdi", slug, "html") in redis_database
@@ -1,6 +1,14 @@
 from src.core.config import settings
 from src.core.enums import APIPrefixesEnum
-from tests.conftest import BaseTest, create_draft, create_post, posts_basic_url
+from tests.conftest import (
+    BaseTest,
+    create_draft,
+    create_post,
+    create_comment,
+    posts_basic_url,
+    comments_basic_url,
+    drafts_basic_url,
+)
 
 bt = BaseTest()
 
@@ -21,7 +29,7 @@ def test_get_self_posts(client, refreshed_mahdi):
     data = response.json()
     assert len(data) == 2
 
-    data1, data2 = data
+    data2, data1 = data  # newest first
     assert data1["title"] == "title"
     assert data1["slug"]
     assert data1["published"]
@@ -52,7 +60,7 @@ def test_get_posts_with_username(client, refreshed_mahdi):
     data = response.json()
     assert len(data) == 2
 
-    data1, data2 = data
+    data2, data1 = data  # newest first
     assert data1["title"] == "title"
     assert data1["slug"]
     assert data1["published"]
@@ -84,3 +92,94 @@ def test_unpublish_post(client, refreshed_mahdi):
 
     response = client.get(f"{posts_basic_url}", headers=h, cookies=c)
     assert not response.json()
+
+
+def test_comments_count_is_maintained(client, refreshed_mahdi):
+    h, c = bt.headers_cookies_tuple(refreshed_mahdi)
+    post_id = create_post(client, h, c, create_draft(client, h, c))
+    slug = client.get(f"{posts_basic_url}/mahdi").json()[0]["slug"]
+
+    comment_id = create_comment(client, h, c, post_id)
+    create_comment(client, h, c, post_id)
+    client.post(
+        f"{comments_basic_url}/{post_id}/{comment_id}",
+        json={"comment": "reply"},
+        headers=h,
+        cookies=c,
+    )
+    assert client.get(f"/@mahdi/{slug}").json()["comments_count"] == 2
+
+    client.delete(f"{comments_basic_url}/{post_id}/{comment_id}", headers=h, cookies=c)
+    assert client.get(f"/@mahdi/{slug}").json()["comments_count"] == 1
+
+
+def test_post_read_model(client, refreshed_mahdi):
+    h, c = bt.headers_cookies_tuple(refreshed_mahdi)
+    body = "word " * 100
+    draft_id = client.post(
+        f"{drafts_basic_url}/",
+        json={"title": "long", "body": body},
+        headers=h,
+        cookies=c,
+    ).json()["id"]
+    create_post(client, h, c, draft_id)
+
+    (post,) = client.get(f"{posts_basic_url}/mahdi").json()
+    assert post["title"] == "long"
+    assert set(post["tags"]) == {"tag1", "tag2"}
+    assert post["excerpt"].endswith("…")
+    assert len(post["excerpt"]) <= 201
+    assert post["excerpt"][:-1] == body[: len(post["excerpt"]) - 1].rstrip()
+
+    response = client.get(f"/@mahdi/{post['slug']}")
+    assert response.status_code == 200, response.text
+    assert response.json()["body"] == body
+
+
+def test_get_posts_pagination(client, refreshed_mahdi):
+    h, c = bt.headers_cookies_tuple(refreshed_mahdi)
+    for title in ("t1", "t2", "t3"):
+        create_post(client, h, c, create_draft(client, h, c, title))
+
+    response = client.get(f"{posts_basic_url}/mahdi?how_many=2&total=true")
+    assert response.status_code == 200, response.text
+    assert [p["title"] for p in response.json()] == ["t3", "t2"]
+    assert response.headers["X-Total-Count"] == "3"
+    cursor = response.headers["X-Next-Cursor"]
+
+    response = client.get(f"{posts_basic_url}/mahdi?how_many=2&cursor={cursor}")
+    assert response.status_code == 200, response.text
+    assert [p["title"] for p in response.json()] == ["t1"]
+    assert "X-Next-Cursor" not in response.headers
+    assert "X-Total-Count" not in response.headers
+
+    response = client.get(f"{posts_basic_url}/mahdi?cursor=garbage")
+    assert response.status_code == 400, response.text
+
+    post_id = client.get(f"{posts_basic_url}/mahdi").json()[0]["id"]
+    client.post(f"{posts_basic_url}/unpublish/{post_id}", headers=h, cookies=c)
+    response = client.get(f"{posts_basic_url}/mahdi?total=true")
+    assert response.headers["X-Total-Count"] == "2"
+
+
+def test_unpublish_post_with_comments(client, refreshed_mahdi):
+    h, c = bt.headers_cookies_tuple(refreshed_mahdi)
+    draft_id = create_draft(client, h, c)
+    post_id = create_post(client, h, c, draft_id)
+    comment_id = create_comment(client, h, c, post_id)
+    client.post(
+        f"{comments_basic_url}/{post_id}/{comment_id}",
+        json={"comment": "reply"},
+        headers=h,
+        cookies=c,
+    )
+
+    response = client.post(f"{posts_basic_url}/unpublish/{post_id}", cookies=c, headers=h)
+    assert response.status_code == 200, response.text
+    assert response.json()["id"] == draft_id
+
+    response = client.get(f"{comments_basic_url}/{post_id}")
+    assert response.status_code == 404, response.text
+
+    # the draft can be published again
+    assert create_post(client, h, c, draft_id)
@@ -0,0 +1,41 @@
+from src.core.rendering import render_markdown
+
+
+def test_render_markdown_escapes_html():
+    assert (
+        render_markdown("<script>x</script>") == "<p>&lt;script&gt;x&lt;/script&gt;</p>"
+    )
+
+
+def test_render_markdown_keeps_emphasis_out_of_links():
+    assert render_markdown("[x](https://en.wikipedia.org/wiki/_foo_)") == (
+        '<p><a href="https://en.wikipedia.org/wiki/_foo_" rel="nofollow noopener">'
+        "x</a></p>"
+    )
+    assert render_markdown("*a [b](http://x/*)") == (
+        '<p>*a <a href="http://x/*" rel="nofollow noopener">b</a></p>'
+    )
+
+
+def test_render_markdown_keeps_code_spans_out_of_hrefs():
+    assert render_markdown("[`a`](http://x/`y`)") == (
+        '<p><a href="http://x/`y`" rel="nofollow noopener"><code>a</code></a></p>'
+    )
+    # and a link inside a code span stays code
+    assert render_markdown("`[a](http://x/)`") == "<p><code>[a](http://x/)</code></p>"
+
+
+def test_render_markdown_formats_around_and_inside_links():
+    assert render_markdown("*a [**b** `c_d_`](http://x/) e*") == (
+        '<p><em>a <a href="http://x/" rel="nofollow noopener">'
+        "<strong>b</strong> <code>c_d_</code></a> e</em></p>"
+    )
+
+
+def test_render_markdown_drops_unsafe_links():
+    assert render_markdown("[x](javascript:alert)") == "<p>x</p>"
+    assert render_markdown("[x](//evil.com)") == "<p>x</p>"
+    assert render_markdown("[x](/\\evil.com)") == "<p>x</p>"
+    assert render_markdown("[x](/about)") == (
+        '<p><a href="/about" rel="nofollow noopener">x</a></p>'
+    )
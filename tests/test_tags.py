@@ -0,0 +1,50 @@
+from tests.conftest import (
+    BaseTest,
+    create_draft,
+    create_post,
+    posts_basic_url,
+    tags_basic_url,
+)
+
+bt = BaseTest()
+
+
+def test_get_tag_posts(client, refreshed_mahdi):
+    h, c = bt.headers_cookies_tuple(refreshed_mahdi)
+    for title in ("t1", "t2", "t3"):
+        create_post(client, h, c, create_draft(client, h, c, title))
+
+    response = client.get(f"{tags_basic_url}/tag1/posts?how_many=2&total=true")
+    assert response.status_code == 200, response.text
+    data = response.json()
+    assert [p["title"] for p in data] == ["t3", "t2"]
+    assert set(data[0]["tags"]) == {"tag1", "tag2"}
+    assert response.headers["X-Total-Count"] == "3"
+    cursor = response.headers["X-Next-Cursor"]
+
+    response = client.get(f"{tags_basic_url}/TAG1/posts?how_many=2&cursor={cursor}")
+    assert response.status_code == 200, response.text
+    assert [p["title"] for p in response.json()] == ["t1"]
+    assert "X-Next-Cursor" not in response.headers
+
+
+def test_tag_posts_count_is_maintained(client, refreshed_mahdi):
+    h, c = bt.headers_cookies_tuple(refreshed_mahdi)
+    post_id = create_post(client, h, c, create_draft(client, h, c))
+    create_post(client, h, c, create_draft(client, h, c))
+
+    response = client.get(f"{tags_basic_url}/tag2/posts?total=true")
+    assert response.headers["X-Total-Count"] == "2"
+
+    client.post(f"{posts_basic_url}/unpublish/{post_id}", headers=h, cookies=c)
+    response = client.get(f"{tags_basic_url}/tag2/posts?total=true")
+    assert response.headers["X-Total-Count"] == "1"
+    assert len(response.json()) == 1
+
+
+def test_get_tag_posts_not_found(client, refreshed_mahdi):
+    response = client.get(f"{tags_basic_url}/nothing/posts")
+    assert response.status_code == 404, response.text
+
+    response = client.get(f"{tags_basic_url}/nothing/posts?cursor=WzEsMl0")
+    assert response.status_code == 400, response.text